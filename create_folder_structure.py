@@ -3,6 +3,11 @@ import os
 folders = [
     "documents",
     "documents/Summaries",
+    "documents/Cache",
+    "documents/Metrics",
+    "documents/Exports",
+    "documents/Manifests",
+    "documents/Catalog",
     "documents/Generated_Reports",
     "documents/Generated_Reports/Cafe_de_Paris",
     "documents/Generated_Reports/Cafe_de_Paris/2024",
@@ -1,11 +1,17 @@
 """This module will act as a wrapper for the ReportGenerator class."""
 from tempfile import SpooledTemporaryFile
+from shutil import copyfileobj
+from os import getpid, remove, replace
 from os.path import exists
+from threading import get_ident
 from scripts.generate_reports import *
 from create_folder_structure import create_folder_structure
 from datetime import timedelta
 from sys import argv
 
+# Uploads are written to disk in chunks of this many bytes, so a large export is never held in memory at once.
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
 class GeneratorController:
     def __init__(self) -> None:
         self.generator : ReportGenerator | None = None 
@@ -40,9 +46,25 @@ class GeneratorController:
         """
         return self.generator.generate_daily_report()
 
+    def generate_reports(self, restaurant_key: str, dates: list[datetime], errors: dict | None=None) -> list[str]:
+        """
+        Generates the daily reports of a restaurant for several dates, opening and saving each weekly workbook once.
+
+        Args:
+            restaurant_key (str): The key of the restaurant to generate the reports for.
+            dates (list[datetime]): The dates to generate reports for.
+            errors (dict, optional): When given, the error of each date that failed is added to it, keyed by date. Defaults to None.
+
+        Returns:
+            list[str]: The paths to the generated workbooks.
+        """
+        generator = ReportGenerator(RestaurantNames.get_restaurant_by_key(restaurant_key), None, ".")
+        return generator.generate_daily_reports(dates, errors)
+
     def upload_file(self, file: SpooledTemporaryFile, filemode: str ):
         """
-        Uploads a file to the specified file mode.
+        Uploads a file to the specified file mode. The file is streamed to disk in chunks, and only replaces a previous
+        upload once it is complete.
 
         Parameters:
             file (SpooledTemporaryFile): The file to be uploaded.
@@ -58,8 +80,19 @@ class GeneratorController:
             Logger.error(f"File mode must be either 'Sales' or 'Payments'.")
             raise ValueError("File mode must be either 'Sales' or 'Payments'.")
         
-        with open(f"./documents/Upload/{self.generator.restaurant_name.replace(' ', '_')}/{self.generator.restaurant_abrv}-{filemode}-{self.generator.date.strftime('%Y%m%d')}.csv", "wb") as f:
-            f.write(file.read())
+        upload_dir = f"./documents/Upload/{self.generator.restaurant_name.replace(' ', '_')}"
+        filename = f"{self.generator.restaurant_abrv}-{filemode}-{self.generator.date.strftime('%Y%m%d')}.csv"
+        file_path = f"{upload_dir}/{filename}"
+        temp_path = f"{upload_dir}/.{filename}.{getpid()}.{get_ident()}.tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                copyfileobj(file, f, UPLOAD_CHUNK_SIZE)
+            replace(temp_path, file_path)
+        finally:
+            if exists(temp_path):
+                remove(temp_path)
+
+        self.generator.catalog.add_upload(self.generator.restaurant_name, self.generator.date, filemode, file_path)
 
 FOLDERS = ["QP_Bistro", "The_Cliff", "Tides", "Cafe_De_Paris"]
 folders = ["BISTRO", "CLIFF", "TIDES", "CAFE"]
@@ -73,17 +106,14 @@ def test():
 
     controller = GeneratorController()
     print("Working for", t_date.strftime("%m/%d/%Y"))
+    dates = []
     while t_date <= end_date:
-        for folder in folders:
-            controller.set_generator(folder, t_date.strftime("%m/%d/%Y"))
-            try:
-                controller.generate_report()
-            except CustomExceptions.BadlyFormattedCSVException as e:
-                print(e)
-            except Exception as e:
-                print(e)
+        dates.append(t_date)
         t_date += timedelta(days=1)
 
+    for folder in folders:
+        controller.generate_reports(folder, dates)
+
 def run_for_date(date: datetime):
     controller = GeneratorController()
 
@@ -0,0 +1,33 @@
+"""This code will be responsible for exporting the daily metrics of a restaurant over a range of dates into a single workbook."""
+
+from datetime import datetime
+from sys import argv
+from scripts.generate_reports import ReportGenerator
+from scripts.utils import Logger, RestaurantNames
+
+def export(restaurant_key: str, start_date: datetime, end_date: datetime) -> str:
+    """
+    Exports the daily metrics of a restaurant, with one row per day.
+
+    Args:
+        restaurant_key (str): The key of the restaurant, e.g. "BISTRO".
+        start_date (datetime): The first date to export.
+        end_date (datetime): The last date to export.
+
+    Returns:
+        str: The path to the exported workbook.
+    """
+    restaurant: RestaurantNames = RestaurantNames.get_restaurant_by_key(restaurant_key)
+    generator = ReportGenerator(restaurant, start_date, ".")
+    return generator.export_metrics(start_date, end_date)
+
+if __name__ == "__main__":
+    if len(argv) != 4:
+        print("Usage: python export_metrics.py <RESTAURANT_KEY> <start dd/mm/yyyy> <end dd/mm/yyyy>")
+    else:
+        try:
+            file_path = export(argv[1].upper(), datetime.strptime(argv[2], "%d/%m/%Y"), datetime.strptime(argv[3], "%d/%m/%Y"))
+            print("Metrics exported to " + file_path)
+        except Exception as e:
+            Logger.error(e)
+            print(e)
@@ -1,11 +1,8 @@
-from datetime import datetime, timedelta
+from datetime import timedelta
 from scripts.generate_comp import CompSummaryGenerator, Logger
-from os import listdir
+from scripts.utils import RestaurantNames, UploadCatalog
 
-report_base = "./documents/Generated_Reports/"
-FOLDERS = ["QP_Bistro", "The_Cliff", "Tides", "Cafe_De_Paris"]
 keys = ["BISTRO", "CLIFF", "TIDES", "CAFE"]
-year = "2024"
 
 results = {
     "BISTRO": [],
@@ -15,22 +12,15 @@ results = {
 }
 
 generator = CompSummaryGenerator(".")
+catalog = UploadCatalog(".").load()
 
-for i, folder in enumerate(FOLDERS):
-    filepath = f"{report_base}{folder}/{year}/"
-    reports = listdir(filepath)
-
-    dates = ['_'.join(report.split("_")[1:3])+f"_{year}" for report in reports]
-
-    start_dates = [datetime.strptime(date, "%d_%b_%Y") for date in dates]
-
-    results[keys[i]] = start_dates
+for key in keys:
+    restaurant_name = RestaurantNames.get_restaurant_by_key(key).value[0]
+    results[key] = UploadCatalog(".").get_report_weeks(restaurant_name, catalog)
 
 for key, datetimes in results.items():
-    for date in sorted(datetimes):
-        try:
-            date += timedelta(days=1)
-            generator.generate_comp_summary(key, date)
-        except Exception as e:
-            Logger.error(e)
-            print(e)
\ No newline at end of file
+    try:
+        generator.generate_comp_summaries(key, [date + timedelta(days=1) for date in datetimes])
+    except Exception as e:
+        Logger.error(e)
+        print(e)
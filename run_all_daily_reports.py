@@ -1,46 +1,166 @@
 import daily_gen
-from os import listdir, path
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from os import path
 from datetime import datetime
-from scripts.utils import Logger
-from threading import Thread
+from sys import argv
+from time import perf_counter
+from scripts.generate_reports import ReportGenerator
+from scripts.utils import Logger, RestaurantNames, UploadCatalog, generic
 
-uploads = "./documents/Upload/"
+# Either "processes", "threads" or "sequential".
+run_mode = "processes"
 
-FOLDERS = ["QP_Bistro", "The_Cliff", "Tides", "Cafe_De_Paris"]
+# The number of workers used by the "processes" and "threads" modes. Defaults to the number of CPUs when None.
+# Can also be given as a command line argument.
+max_workers = None
 
-run_threaded = True
+# Whether to skip the days whose uploads, template and format have not changed since they were generated.
+# Every day can be generated again by giving --all as a command line argument.
+# Uploads are found through the upload catalog, which scans a restaurant's folders again whenever they change.
+# The whole catalog can also be rebuilt from the upload folders by giving --rescan.
+skip_unchanged = True
 
-def run_thread(i, folder):
-    files = [file for file in listdir(uploads + folder) if "Payments" in file]
-    for file in files:
-        key = file.split("-")[0]
-        date_str = file.split("-")[-1].split(".")[0]
+def get_dates(restaurant_name: str, catalog: dict) -> list[datetime]:
+    """
+    Gets every date of a restaurant that has both a Sales and a Payments upload.
 
-        if not path.exists(f"{uploads}{folder}/{key}-Sales-{date_str}.csv"):
-            continue
+    Args:
+        restaurant_name (str): The name of the restaurant.
+        catalog (dict): The loaded upload catalog.
 
-        date_obj = datetime.strptime(date_str, "%Y%m%d")
-        parsed_date_str = date_obj.strftime("%m/%d/%Y")
+    Returns:
+        list[datetime]: The dates to generate reports for.
+    """
+    dates = UploadCatalog(".").get_upload_dates(restaurant_name, catalog)
+    if not dates:
+        Logger.warning(f"No uploads found for {restaurant_name}")
+    return dates
 
+def get_jobs(only_changed: bool=True, rescan: bool=False) -> list[tuple[str, str, list[datetime]]]:
+    """
+    Splits the uploaded dates of every restaurant into one job per weekly workbook, so no two jobs write the same file.
+
+    Args:
+        only_changed (bool, optional): Whether to skip the dates the manifest records as generated from their current inputs. Defaults to True.
+        rescan (bool, optional): Whether to rebuild the upload catalog from the upload folders first. Defaults to False.
+
+    Returns:
+        list[tuple[str, str, list[datetime]]]: The restaurant key, weekly workbook and dates of each job.
+    """
+    upload_catalog = UploadCatalog(".")
+    catalog = upload_catalog.rebuild() if rescan else upload_catalog.load()
+
+    jobs = []
+    for restaurant_key in daily_gen.folders:
+        restaurant: RestaurantNames = RestaurantNames.get_restaurant_by_key(restaurant_key)
+
+        generator = ReportGenerator(restaurant, None, ".")
+        manifest = generator.manifest.load(generator.restaurant_name)
+
+        weeks: dict[str, list[datetime]] = {}
+        skipped = 0
+        for date in get_dates(generator.restaurant_name, catalog):
+            if only_changed and generator.for_date(date).is_generated(manifest):
+                skipped += 1
+                continue
+
+            report_filename = generic.get_report_filename(date, restaurant.value[0], restaurant.value[1], ".")
+            weeks.setdefault(report_filename, []).append(date)
+
+        jobs.extend((restaurant_key, report_filename, dates) for report_filename, dates in weeks.items())
+        if skipped:
+            Logger.log(f"Skipping {skipped} day(s) of {restaurant_key} that are already up to date")
+    return jobs
+
+def run_job(restaurant_key: str, report_filename: str, dates: list[datetime]) -> dict:
+    """
+    Generates the daily reports of a single weekly workbook.
+
+    Args:
+        restaurant_key (str): The key of the restaurant.
+        report_filename (str): The weekly workbook the dates are stored in.
+        dates (list[datetime]): The dates to generate reports for.
+
+    Returns:
+        dict: The outcome of the job, with the number of dates generated, and the error of each date that failed.
+    """
+    start = perf_counter()
+    errors = {}
+    try:
         controller = daily_gen.GeneratorController()
-        controller.set_generator(daily_gen.folders[i], parsed_date_str)
+        controller.generate_reports(restaurant_key, dates, errors)
+    except Exception as e:
+        errors.update((date, e) for date in dates if date not in errors)
+
+    return {
+        "restaurant": restaurant_key,
+        "workbook": report_filename,
+        "generated": len(dates) - len(errors),
+        "errors": {date.strftime("%m/%d/%Y"): f"{type(e).__name__}: {e}" for date, e in errors.items()},
+        "seconds": perf_counter() - start,
+    }
+
+def run_all(mode: str=run_mode, workers: int | None=max_workers, only_changed: bool=True, rescan: bool=False) -> list[dict]:
+    """
+    Generates every uploaded daily report.
+
+    Args:
+        mode (str, optional): Either "processes", "threads" or "sequential". Defaults to run_mode.
+        workers (int, optional): The number of workers. Defaults to max_workers.
+        only_changed (bool, optional): Whether to only generate new or changed days. Defaults to True.
+        rescan (bool, optional): Whether to rebuild the upload catalog first, for uploads that were copied in by hand. Defaults to False.
+
+    Returns:
+        list[dict]: The outcome of each job, from run_job.
+    """
+    jobs = get_jobs(only_changed, rescan)
+
+    if mode == "sequential":
+        return [run_job(*job) for job in jobs]
+
+    executor_type = ProcessPoolExecutor if mode == "processes" else ThreadPoolExecutor
+    with executor_type(max_workers=workers) as executor:
+        futures: list[tuple[tuple, Future]] = [(job, executor.submit(run_job, *job)) for job in jobs]
+
+    results = []
+    for (restaurant_key, report_filename, dates), future in futures:
         try:
-            controller.generate_report()
+            results.append(future.result())
         except Exception as e:
-            Logger.error(e)
-            print(e)
+            # The worker itself failed, such as a worker process being killed.
+            results.append({
+                "restaurant": restaurant_key,
+                "workbook": report_filename,
+                "generated": 0,
+                "errors": {date.strftime("%m/%d/%Y"): f"{type(e).__name__}: {e}" for date in dates},
+                "seconds": 0.0,
+            })
+    return results
+
+def log_summary(results: list[dict], seconds: float) -> None:
+    """
+    Logs the outcome of every job, followed by the totals.
+
+    Args:
+        results (list[dict]): The outcome of each job, from run_job.
+        seconds (float): How long the whole run took.
+
+    Returns:
+        None
+    """
+    for result in results:
+        Logger.log(f"{result['restaurant']} {path.basename(result['workbook'])}: {result['generated']} day(s) generated, {len(result['errors'])} failed in {result['seconds']:.1f}s")
+        for date, error in result["errors"].items():
+            Logger.error(f"    {date}: {error}")
+
+    generated = sum(result["generated"] for result in results)
+    failed = sum(len(result["errors"]) for result in results)
+    Logger.log(f"Generated {generated} day(s) across {len(results)} workbook(s) in {seconds:.1f}s, {failed} failed")
 
 if __name__ == "__main__":
-    if run_threaded:
-        threads = []
-        for i, folder in enumerate(FOLDERS):
-            tf = Thread(target=run_thread, args=(i, folder,))
-            tf.start()
-            threads.append(tf)
-
-        for thread in threads:
-            thread.join()
-    else:
-        for i, folder in enumerate(FOLDERS):
-            run_thread(i, folder)
+    numbers = [arg for arg in argv[1:] if arg.isdigit()]
+    workers = int(numbers[0]) if numbers else max_workers
 
+    start = perf_counter()
+    results = run_all(run_mode, workers, skip_unchanged and "--all" not in argv, "--rescan" in argv)
+    log_summary(results, perf_counter() - start)
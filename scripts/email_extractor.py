@@ -12,9 +12,9 @@ from datetime import datetime
 
 try:
     from .utils.enums import RestaurantNames
-    from .utils import Logger
+    from .utils import Logger, UploadCatalog
 except ImportError:
-    from utils import Logger
+    from utils import Logger, UploadCatalog
     from utils.enums import RestaurantNames
 
 SCOPES = ["https://www.googleapis.com/auth/gmail.readonly"]
@@ -33,6 +33,7 @@ class EmailExtractor:
             None
         """
         self.root = root
+        self.catalog = UploadCatalog(root)
         self.creds: Credentials = self.get_credentials()
     
     def get_credentials(self) -> Credentials:
@@ -132,11 +133,15 @@ class EmailExtractor:
 
                 file = service.users().messages().attachments().get(userId="me", messageId=file_info['messageID'], id=file_id).execute()
                 
-                stored_filename = f"{self.root}/documents/Upload/{RestaurantNames.get_restaurant_by_abrv(file_info['KEY']).value[0].replace(' ', '_')}/{file_info['filename']}"
+                restaurant_name = RestaurantNames.get_restaurant_by_abrv(file_info['KEY']).value[0]
+                stored_filename = f"{self.root}/documents/Upload/{restaurant_name.replace(' ', '_')}/{file_info['filename']}"
                 with open(stored_filename, "wb") as f:
                     f.write(base64.urlsafe_b64decode(file['data'].encode('utf-8')))
                     Logger.log(f"Downloaded {stored_filename}")
                     print("Downloaded " + stored_filename)
+
+                if file_info['MODE'] in ("Sales", "Payments"):
+                    self.catalog.add_upload(restaurant_name, datetime.strptime(file_info['DATE'], "%d_%m_%Y"), file_info['MODE'], stored_filename)
             
         return first_date
 
@@ -1,37 +1,165 @@
 """This will be the driver used to create the comp summary report for each restaurant."""
 from datetime import datetime
-from os.path import exists
+from os.path import exists, getmtime
+from openpyxl.utils import column_index_from_string, get_column_letter
 try:
     from utils import *
+    from generate_reports import ReportGenerator
 except ModuleNotFoundError:
     from .utils import *
+    from .generate_reports import ReportGenerator
 
 class CompSummaryGenerator:
+    # The header of a week holds its week-end date, and is displayed as "WE Mon-dd".
+    WEEK_HEADER_FORMAT = '"WE "mmm-dd'
+
     def __init__(self, root: str=".."):
         self.root = root
 
     def generate_comp_summary(self, restaurant_key: str, date: datetime) -> str:
-        Logger.log(f"Generating comp summary for {restaurant_key} for week including {date.strftime('%m/%d/%Y')} ")
+        """
+        Generates the comp summary column for a single week.
+
+        Args:
+            restaurant_key (str): The key of the restaurant to generate the summary for.
+            date (datetime): A date in the week. Its report is the one that includes the day before it.
+
+        Returns:
+            str: The path to the summary workbook.
+        """
+        name_obj: RestaurantNames = RestaurantNames.get_restaurant_by_key(restaurant_key)
+        return self.write_summary(name_obj, {self.get_week_end(date): self.read_week_entries(name_obj, date)})
+
+    def generate_comp_summaries(self, restaurant_key: str, dates: list[datetime]) -> str:
+        """
+        Generates the comp summary columns for several weeks, opening and saving the summary workbook only once.
+
+        Weeks that fail to generate are logged and skipped, so they do not stop the rest from being saved.
+
+        Args:
+            restaurant_key (str): The key of the restaurant to generate the summary for.
+            dates (list[datetime]): A date in each week to generate, following the same rules as generate_comp_summary.
+
+        Returns:
+            str: The path to the summary workbook.
+        """
         # Get the restaurnt name
         name_obj: RestaurantNames = RestaurantNames.get_restaurant_by_key(restaurant_key)
+
+        # Pull the summary of each week from its lunch summary, oldest week first.
+        weeks: dict[datetime, list] = {}
+        for date in sorted(dates):
+            week_end = self.get_week_end(date)
+            if week_end in weeks:
+                continue
+            try:
+                weeks[week_end] = self.read_week_entries(name_obj, date)
+            except Exception as e:
+                Logger.error(f"Unable to generate comp summary for {restaurant_key} for week including {date.strftime('%m/%d/%Y')}. More details: {e}")
+
+        return self.write_summary(name_obj, weeks)
+
+    def write_summary(self, name_obj: RestaurantNames, weeks: dict[datetime, list]) -> str:
+        """
+        Writes the columns of several weeks into the comp summary workbook, and saves it.
+
+        Args:
+            name_obj (RestaurantNames): The restaurant the summary is for.
+            weeks (dict[datetime, list]): The values of each week, from read_week_entries, keyed by the week's end date, oldest week first.
+
+        Returns:
+            str: The path to the summary workbook.
+        """
+        abr = name_obj.value[1]
+
+        # Create or open restaurnt_name_comp_summary.xlsx
+        summary_format = ReportLayout.get_format(f"{self.root}/scripts/Report_Format.json")["COMP_SUMMARY"]
+        template_file_path = f"{self.root}/scripts/Report_Templates/Summaries/{abr}_Comp_Summary_Template.xlsx"
+        summary_file_path = f"{self.root}/documents/Summaries/{abr}_Comp_Summary.xlsx"
+
+        if not weeks:
+            return summary_file_path
+
+        def open_summary() -> ExcelController:
+            if exists(summary_file_path):
+                Logger.log(f"Inserting into existing summary at {summary_file_path}")
+                return ExcelController(summary_file_path)
+            Logger.log(f"Creating new summary at {summary_file_path}")
+            return ExcelController.from_template(template_file_path)
+
+        def write_weeks(summary_controller: ExcelController) -> int:
+            summary_controller.change_sheet(summary_format["SHEET"])
+
+            # Checks if the data was entered before. If so, will use that column and overwrite it.
+            existing = self.get_week_index(summary_controller, summary_format)
+            columns = {week_end: existing.get(week_end) for week_end in weeks}
+
+            # The summary is a rolling report that reads from the latest week on the left, so every new week gets its
+            # own column at the start of the summary. The columns are all inserted at once, so the sheet is only shifted once.
+            new_weeks = [week_end for week_end, col in columns.items() if col is None]
+            if new_weeks:
+                first = column_index_from_string(summary_format["COL"])
+                summary_controller.insert_col(first, len(new_weeks))
+                for week_end, col in columns.items():
+                    if col is not None:
+                        columns[week_end] = get_column_letter(column_index_from_string(col) + len(new_weeks))
+                for i, week_end in enumerate(reversed(new_weeks)):
+                    columns[week_end] = get_column_letter(first + i)
+
+            changed = 0
+            for week_end, entries in weeks.items():
+                changed += self.write_week_column(summary_controller, summary_format, columns[week_end], week_end, entries)
+            return changed
+
+        # Save and close the file, unless the existing summary is already up to date.
+        if WorkbookWriter.update(summary_file_path, open_summary, write_weeks):
+            Logger.log(f"Summary for {len(weeks)} week(s) generated and stored in {summary_file_path}")
+        else:
+            Logger.log(f"Summary in {summary_file_path} is already up to date")
+
+        # Return filepath
+        return summary_file_path
+
+    def get_week_end(self, date: datetime) -> datetime:
+        """
+        Gets the end date of the week of a date, which identifies the week's summary column.
+
+        Args:
+            date (datetime): A date in the week, following the same rules as generate_comp_summary.
+
+        Returns:
+            datetime: The last day of the week, at midnight.
+        """
+        _, end_day = generic.get_week_period(generic.diff_days(date, 1))
+        return datetime(end_day.year, end_day.month, end_day.day)
+
+    def read_week_entries(self, name_obj: RestaurantNames, date: datetime) -> list:
+        """
+        Reads the values of a week that go into its summary column.
+
+        Args:
+            name_obj (RestaurantNames): The restaurant the summary is for.
+            date (datetime): A date in the week, following the same rules as generate_comp_summary.
+
+        Returns:
+            list: The LDSP totals, followed by the LDSP summary values.
+        """
+        Logger.log(f"Generating comp summary for {name_obj.value[0]} for week including {date.strftime('%m/%d/%Y')} ")
         name = '_'.join(name_obj.value[0].split(" "))
         abr = name_obj.value[1]
 
         # Get the filepath of the report
         report_filepath = generic.get_report_filename(date, name, abr, self.root)
-        
+
         # Pull the summary from the lunch summary.
-        format = generic.parse_json_file(f"{self.root}/scripts/Report_Format.json")
-        lunch_format = format["LDSP"]
-        summary_format = format["COMP_SUMMARY"]
-        report_controller = ExcelController(report_filepath, True)
+        lunch_format = ReportLayout.get_format(f"{self.root}/scripts/Report_Format.json")["LDSP"]
+        report_controller = self.get_report_controller(name_obj, date, report_filepath)
 
         report_controller.change_sheet(lunch_format["SHEET"])
 
         entries = []
         for i in range(lunch_format["START"], lunch_format["END"] + 1):
             data = report_controller.read_from_cell(f"{lunch_format['TOTALS']}{i}")
-            title = report_controller.read_from_cell(f"A{i}")
             entries.append(data)
 
         for i in range(lunch_format["SUMMARY_START"], lunch_format["SUMMARY_END"] + 1):
@@ -39,68 +167,138 @@ class CompSummaryGenerator:
                 data = round(report_controller.read_from_cell(f"{lunch_format['SUMMARY']}{i}"), 2)
             except:
                 data = report_controller.read_from_cell(f"{lunch_format['SUMMARY']}{i}")
-            title = report_controller.read_from_cell(f"A{i}")
             entries.append(data)
 
-        # Create or open restaurnt_name_comp_summary.xlsx
-        template_file_path = f"{self.root}/scripts/Report_Templates/Summaries/{abr}_Comp_Summary_Template.xlsx"
-        summary_file_path = f"{self.root}/documents/Summaries/{abr}_Comp_Summary.xlsx"
-        
-        if exists(summary_file_path):
-            summary_controller = ExcelController(summary_file_path)
-            Logger.log("Inserting into existing summary at {summary_file_path}")
-        else:
-            summary_controller = ExcelController(template_file_path)
-            Logger.log(f"Creating new summary at {summary_file_path}")
-        summary_controller.change_sheet(summary_format["SHEET"])
+        return entries
 
-        # Insert column containing data from the summary
-        _, end_day = generic.get_week_period(generic.diff_days(date, 1))
-        header = f"WE {end_day.strftime('%b-%d')}"
+    def get_week_index(self, summary_controller: ExcelController, summary_format: dict) -> dict[datetime, str]:
+        """
+        Indexes the weeks already in the summary by the end date in their header.
+        The headers only display the month and day, so the full date keeps the same week of different years apart.
 
-        check_start = "B"
-        col = None
+        Args:
+            summary_controller (ExcelController): The controller for the summary workbook.
+            summary_format (dict): The COMP_SUMMARY section of the report format.
 
-        # Checks if the data was entered before. If so, will use that column and overwrite it.
-        for i in range(0, 10):
-            value = summary_controller.read_from_cell(f"{check_start}5")
-            if value != header:
-                check_start = f"{chr(ord(check_start) + 1)}"
-            else:
-                col = check_start
-                break
-        
-        if not col:
-            summary_controller.insert_col(2)
-            col = summary_format["COL"]
+        Returns:
+            dict[datetime, str]: The column letter of each week keyed by its end date.
+        """
+        first = column_index_from_string(summary_format["COL"])
+        headers = summary_controller.read_row(int(summary_format["WEEK"]), first)
+
+        index = {}
+        for i, value in enumerate(headers):
+            if isinstance(value, datetime):
+                index.setdefault(value, get_column_letter(first + i))
+
+        return index
+
+    def write_week_column(self, summary_controller: ExcelController, summary_format: dict, col: str, week_end: datetime, entries: list) -> int:
+        """
+        Writes the values of a week into its summary column.
+
+        Args:
+            summary_controller (ExcelController): The controller for the summary workbook.
+            summary_format (dict): The COMP_SUMMARY section of the report format.
+            col (str): The column letter of the week.
+            week_end (datetime): The end date of the week, which is written as its header.
+            entries (list): The values of the week, from read_week_entries.
+
+        Returns:
+            int: The number of cells whose value or style was changed.
+        """
         start = summary_format["START"]
 
-        summary_controller.insert_data_into_cell(header, f"{col}{summary_format['WEEK']}")
+        header = f"{col}{summary_format['WEEK']}"
+        values = {header: week_end}
+        styles = {}
+        accounting = []
 
         # Calculating bar only covers (Alcohol, Non-Alcohol, Water)
         
         bars = (17, 18, 19)
         for i, entry in enumerate(entries):
-            field = summary_controller.read_from_cell(f"A{start}")
+            cell = f"{col}{start}"
             if start > 14:
-                summary_controller.make_cell_accounting(f"{col}{start}")
-            summary_controller.copy_cell_style_to(f"A{start}", f"{col}{start}")
+                accounting.append(cell)
+            styles[cell] = f"A{start}"
 
             if i in bars:
-                summary_controller.insert_data_into_cell((summary_controller.read_from_cell(f"{col}{start}") if i != bars[0] else 0) + entry, f"{col}{start}")
+                values[cell] = (values[cell] if i != bars[0] else 0) + entry
                 if i == bars[-1]:
                     start += 1
             else:
-                summary_controller.insert_data_into_cell(entry, f"{col}{start}")
+                values[cell] = entry
                 start += 1
 
-        # Save and close the file.
-        summary_controller.save(summary_file_path)
+        # The accounting style is applied before the row's fill and font are copied over it.
+        changed = summary_controller.make_cells_accounting(accounting)
+        changed += summary_controller.format_cells([header], self.WEEK_HEADER_FORMAT)
+        changed += summary_controller.copy_cell_styles(styles)
+        changed += summary_controller.write_cells(values)
+        return changed
 
-        # Return filepath
-        Logger.log(f"Summary generated and stored in {summary_file_path}")
-        print("Summary generated and stored in " + summary_file_path)
-        return summary_file_path
+    def get_report_controller(self, name_obj: RestaurantNames, date: datetime, report_filepath: str) -> ExcelController:
+        """
+        Gets a controller that evaluates the weekly report, preferring the stored metrics over reading the workbook.
+
+        Args:
+            name_obj (RestaurantNames): The restaurant the summary is for.
+            date (datetime): A date in the week of the summary.
+            report_filepath (str): The path to the weekly report workbook.
+
+        Returns:
+            ExcelController: A controller for the weekly report, opened with data_only.
+        """
+        controller = self.build_from_metrics(name_obj, date, report_filepath)
+        if controller is None:
+            Logger.log(f"Reading the weekly report at {report_filepath}")
+            controller = ExcelController(report_filepath, True)
+        return controller
+
+    def build_from_metrics(self, name_obj: RestaurantNames, date: datetime, report_filepath: str) -> ExcelController | None:
+        """
+        Rebuilds the weekly report in memory from the metrics stored by the daily reports, without opening the workbook.
+
+        The stored metrics are only used when every uploaded day of the week has them, and the workbook has not been
+        modified since they were stored. Otherwise, the workbook may contain data the metrics do not, and None is returned.
+
+        Args:
+            name_obj (RestaurantNames): The restaurant the summary is for.
+            date (datetime): A date in the week of the summary.
+            report_filepath (str): The path to the weekly report workbook.
+
+        Returns:
+            ExcelController | None: A controller for the rebuilt report, opened with data_only, or None if the stored metrics cannot be used.
+        """
+        start_day, _ = generic.get_week_period(generic.diff_days(date, 1))
+
+        # Each daily report is generated the day after the day it covers.
+        metrics: list[tuple[ReportGenerator, dict]] = []
+        for i in range(7):
+            generator = ReportGenerator(name_obj, generic.add_days(start_day, i + 1), self.root)
+            data = generator.metrics.load(generator.restaurant_name, generator.restaurant_abrv, generator.date)
+            if data is not None:
+                metrics.append((generator, data))
+            elif exists(generator.get_upload_filepath("Sales")):
+                return None
+
+        if not metrics:
+            return None
+
+        stored_at = max(generator.metrics.get_mtime(generator.restaurant_name, generator.restaurant_abrv, generator.date) for generator, _ in metrics)
+        if exists(report_filepath) and getmtime(report_filepath) > stored_at:
+            return None
+
+        template_path = f"{self.root}/scripts/Report_Templates/{name_obj.value[0].replace(' ', '_')}_Sales_Report_Template.xlsx"
+        # The pooled template is shared, so the day's values are laid over it in the evaluator instead of being written into it.
+        controller = ExcelController(template_path, True, ExcelController.get_template(template_path))
+        for generator, data in metrics:
+            sheet_name, cells = generator.get_daily_cells(data)
+            controller.evaluator.seed(sheet_name, dict(cells))
+
+        Logger.log(f"Rebuilt the weekly report from the metrics of {len(metrics)} day(s)")
+        return controller
     
 if __name__ == "__main__":
     generator = CompSummaryGenerator()
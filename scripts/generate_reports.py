@@ -3,6 +3,9 @@ import pandas as pd
 from pandas import DataFrame
 from datetime import datetime
 from json import dumps
+from os import makedirs
+from os.path import dirname
+from typing import Callable
 
 try:
     from .utils import *
@@ -22,48 +25,163 @@ class ReportGenerator:
             None
         """
 
+        self.restaurant:      RestaurantNames       = restaurant_name
         self.restaurant_name: str                   = restaurant_name.value[0]
         self.restaurant_abrv: str                   = restaurant_name.value[1]
         self.date:            datetime              = date or datetime.now()
         self.helper:          ReportGeneratorHelper = ReportGeneratorHelper
         self.root:            str                   = root
+        self.cache:           DataCache             = DataCache(root, ReportGeneratorHelper.CLEANER_VERSION)
+        self.metrics:         MetricsStore          = MetricsStore(root, ReportGeneratorHelper.METRICS_VERSION)
+        self.manifest:        UploadManifest        = UploadManifest(root, f"{ReportGeneratorHelper.CLEANER_VERSION}.{ReportGeneratorHelper.METRICS_VERSION}")
+        self.catalog:         UploadCatalog         = UploadCatalog(root)
+        self.fingerprints:    dict | None           = None
 
     def generate_daily_report(self) -> str:
+        # Step 0 - 2: Load, clean and run calculations on the day's data.
+        calculated_results = self.calculate_daily_results()
+
+        # Step 3: Save the results into the correct spreadsheeet
+        output_path = self.render_daily_template(calculated_results)
+        Logger.log(f"Report generated and stored in {output_path}")
+        print("Report generated and stored in " + output_path)
+
+        # Step 4: Store the calculated metrics, once the workbook they were rendered into is saved.
+        self.store_metrics(calculated_results)
+        self.record_generated([self], output_path)
+
+        # Step 5: Export data to QuickBooks Format.
+        return output_path
+
+    def generate_daily_reports(self, dates: list[datetime], errors: dict | None=None) -> list[str]:
+        """
+        Generates the daily reports for several dates, opening and saving each weekly workbook only once.
+
+        Dates that fail to generate are logged and skipped, so they do not stop the rest of their week from being saved.
+
+        Parameters:
+            dates (list[datetime]): The dates to generate reports for.
+            errors (dict, optional): When given, the error of each date that failed is added to it, keyed by date. Defaults to None.
+
+        Returns:
+            list[str]: The paths to the generated workbooks.
+        """
+        # Group the dates by the weekly workbook they are stored in.
+        weeks: dict[str, list[datetime]] = {}
+        for date in sorted(set(dates)):
+            report_filename = generic.get_report_filename(date, self.restaurant_name, self.restaurant_abrv, self.root)
+            weeks.setdefault(report_filename, []).append(date)
+
+        output_paths = []
+        for report_filename, week_dates in weeks.items():
+            calculated: list[tuple[ReportGenerator, dict]] = []
+            for date in week_dates:
+                generator = self.for_date(date)
+                try:
+                    calculated.append((generator, generator.calculate_daily_results()))
+                except Exception as e:
+                    Logger.error(f"Unable to generate report for {date} for {self.restaurant_name}. More details: {e}")
+                    if errors is not None:
+                        errors[date] = e
+
+            if not calculated:
+                continue
+
+            filled: list[tuple[ReportGenerator, dict]] = []
+
+            def fill_week(controller: ExcelController) -> int:
+                changed = 0
+                for generator, data in calculated:
+                    try:
+                        changed += generator.fill_daily_sheet(controller, data)
+                        filled.append((generator, data))
+                    except Exception as e:
+                        Logger.error(f"Unable to generate report for {generator.date} for {self.restaurant_name}. More details: {e}")
+                        if errors is not None:
+                            errors[generator.date] = e
+                return changed
+
+            # The calculations are done beforehand, so the workbook is only held for as long as it takes to fill it.
+            try:
+                WorkbookWriter.update(report_filename, lambda: self.open_report_workbook(report_filename), fill_week)
+            except Exception as e:
+                Logger.error(f"Unable to save the reports in {report_filename} for {self.restaurant_name}. More details: {e}")
+                if errors is not None:
+                    errors.update((generator.date, e) for generator, _ in calculated)
+                continue
+
+            if filled:
+                Logger.log(f"Reports for {len(filled)} day(s) generated and stored in {report_filename}")
+                output_paths.append(report_filename)
+
+                for generator, data in filled:
+                    generator.store_metrics(data)
+                self.record_generated([generator for generator, _ in filled], report_filename)
+
+        return output_paths
+
+    def for_date(self, date: datetime) -> "ReportGenerator":
+        """
+        Creates a ReportGenerator for the same restaurant and root, but a different date.
+
+        Parameters:
+            date (datetime): The date for the new generator.
+
+        Returns:
+            ReportGenerator: The new generator.
+        """
+        return ReportGenerator(self.restaurant, date, self.root)
+
+    def calculate_daily_results(self) -> dict:
+        """
+        Loads and cleans the Sales and Payments data for the generator's date, then runs the calculations on them.
+
+        Raises:
+            FileNotFoundError: If either the Sales or Payments file does not exist.
+            CustomExceptions.BadlyFormattedCSVException: If either CSV file is badly formatted.
+
+        Returns:
+            dict: The calculated results, from calculations.
+        """
         # Step 0: Prepare the date, and load in the correct format.
         Logger.log(f"Generating report for {self.date} for {self.restaurant_name}")
-        target_date_string = self.date.strftime("%Y%m%d")
 
-        # Step 1: Load the csv with either the provided date, or the current one into dataframes.
-        sales_filepath = f"{self.root}/documents/Upload/{self.restaurant_name.replace(' ', '_')}/{self.restaurant_abrv}-Sales-{target_date_string}.csv"
-        payments_filepath = f"{self.root}/documents/Upload/{self.restaurant_name.replace(' ', '_')}/{self.restaurant_abrv}-Payments-{target_date_string}.csv"
+        # The inputs are fingerprinted before they are read, so the manifest never records changes made while they are in use.
+        self.fingerprints = self.manifest.fingerprint_inputs(self.get_manifest_inputs())
 
-        sales_df_dirty = self.get_df_from_csv(sales_filepath, [SalesColumnNames.DATE.value])
-        payments_df_dirty= self.get_df_from_csv(payments_filepath, [PaymentColumnNames.DATE.value]) 
+        # Step 1: Load the csv with either the provided date, or the current one into dataframes.
+        sales_filepath = self.get_upload_filepath("Sales")
+        payments_filepath = self.get_upload_filepath("Payments")
 
-        # Step 2 Part 1: Perform any cleanup operations on dataframes
-        sales_df = self.helper.clean_sales(sales_df_dirty)
-        payments_df = self.helper.clean_payments(payments_df_dirty)
+        # Step 2 Part 1: Perform any cleanup operations on dataframes (Skipped when the cleaned data is cached)
+        sales_df = self.get_clean_df(sales_filepath, SalesColumnNames, self.helper.clean_sales, [SalesColumnNames.DATE.value])
+        payments_df = self.get_clean_df(payments_filepath, PaymentColumnNames, self.helper.clean_payments)
 
         # Step 2 Part 2: Run calculations on the dataframes
-        calculated_results = self.calculations(sales_df, payments_df)
+        return self.calculations(sales_df, payments_df)
 
-        # Step 3: Save the results into the correct spreadsheeet
-        output_path = self.render_daily_template(calculated_results)
-        Logger.log(f"Report generated and stored in {output_path}")
-        print("Report generated and stored in " + output_path)
+    def get_upload_filepath(self, filemode: str) -> str:
+        """
+        Gets the path of an uploaded CSV for the generator's date.
 
-        # Step 4: Store data in database
+        Parameters:
+            filemode (str): The kind of upload, either "Sales" or "Payments".
 
-        # Step 5: Export data to QuickBooks Format.
-        return output_path
+        Returns:
+            str: The path to the uploaded CSV.
+        """
+        return f"{self.root}/documents/Upload/{self.restaurant_name.replace(' ', '_')}/{self.restaurant_abrv}-{filemode}-{self.date.strftime('%Y%m%d')}.csv"
 
-    def get_df_from_csv(self, filepath: str, date_fields: list=[]) -> DataFrame:
+    def get_df_from_csv(self, filepath: str, date_fields: list=[], columns: type[SalesColumnNames] | type[PaymentColumnNames] | None=None, engine: str | None=None) -> DataFrame:
         """
         Reads a CSV file from the given filepath and returns a pandas DataFrame.
 
         Parameters:
             filepath (str): The path to the CSV file.
             date_fields (list, optional): A list of column names to parse as dates. Defaults to an empty list.
+            columns (SalesColumnNames | PaymentColumnNames, optional): The column enum describing the CSV. When given, only its columns
+                are read, using the dtypes it defines. Defaults to reading every column with inferred types.
+            engine (str, optional): The pandas CSV engine to use, such as "c" or "pyarrow". Defaults to pandas' own default.
 
         Raises:
             CustomExceptions.BadlyFormattedCSVException: If the CSV file is badly formatted.
@@ -72,8 +190,20 @@ class ReportGenerator:
             DataFrame: The pandas DataFrame containing the data from the CSV file.
         """
         self.helper.validate_file_exists(filepath)
+
+        options = {}
+        if engine:
+            options["engine"] = engine
+
         try:
-            df = pd.read_csv(filepath, parse_dates=date_fields, date_format="%Y-%m-%d")
+            if columns is not None:
+                # Only read the columns that are both used in the report and present in this export.
+                header = pd.read_csv(filepath, nrows=0).columns
+                wanted = set(columns.get_csv_columns()) | set(date_fields)
+                options["usecols"] = [column for column in header if column in wanted]
+                options["dtype"] = {column: dtype for column, dtype in columns.get_dtypes().items() if column in header}
+
+            df = pd.read_csv(filepath, parse_dates=date_fields, date_format="%Y-%m-%d", **options)
         except pd.errors.ParserError as e:
             raise CustomExceptions.BadlyFormattedCSVException(f"Error parsing CSV File in {filepath}. CSV is most likely corrupted. More details: {e}")
         except ValueError as e:
@@ -81,6 +211,38 @@ class ReportGenerator:
 
         return df
 
+    def get_clean_df(self, filepath: str, columns: type[SalesColumnNames] | type[PaymentColumnNames], cleaner: Callable[[DataFrame], DataFrame], date_fields: list=[]) -> DataFrame:
+        """
+        Reads and cleans a CSV file, reusing the cached result if the same file has been cleaned before.
+
+        Parameters:
+            filepath (str): The path to the CSV file.
+            columns (SalesColumnNames | PaymentColumnNames): The column enum describing the CSV.
+            cleaner (Callable[[DataFrame], DataFrame]): The helper function used to clean the DataFrame.
+            date_fields (list, optional): A list of column names to parse as dates. Defaults to an empty list.
+
+        Raises:
+            CustomExceptions.BadlyFormattedCSVException: If the CSV file is badly formatted.
+
+        Returns:
+            DataFrame: The cleaned DataFrame.
+        """
+        self.helper.validate_file_exists(filepath)
+
+        if not self.cache.enabled:
+            return cleaner(self.get_df_from_csv(filepath, date_fields, columns))
+
+        # The file is hashed once, before it is read, so the entry matches the contents that were cleaned.
+        settings = dumps({"columns": columns.get_csv_columns(), "dtypes": columns.get_dtypes(), "date_fields": date_fields}, sort_keys=True)
+        digest = self.cache.get_digest(filepath, settings)
+
+        df = self.cache.load(filepath, digest)
+        if df is None:
+            df = cleaner(self.get_df_from_csv(filepath, date_fields, columns))
+            self.cache.store(filepath, df, digest)
+
+        return df
+
     def calculations(self, sales_df: DataFrame, payments_df: DataFrame) -> dict:
         """
         Calculate various financial metrics based on the sales and payments data.
@@ -103,38 +265,15 @@ class ReportGenerator:
         # Calculate total USD and BBD spent by Meal Type
         spent_by_session_type = self.helper.calculate_total_by_meal_and_payment_type(payments_df)
         
-        # Calculate total BBD spent by Meal Type sub-categories
-        spent_by_sub_categories = self.helper.calculate_total_by_subcategory(sales_df)
-
-        # Calculate number of Guests by Meal Type
-        guests_by_meal_type = self.helper.calculate_guests_by_meal_type(sales_df, self.restaurant_abrv == "CDP")
-
-        # Calculate Service Charge
-        service_charge = self.helper.calculate_service_charge(sales_df)
-
-        # Calculate Complimentary Covers.
-        complimentary_covers = self.helper.calculate_complimentary_covers(sales_df)
-
-        # Calculate Bar Only Covers
-        bar_only_covers = self.helper.calculate_bar_only_covers(sales_df)
-
-        # Calculate VAT
-        vat = self.helper.calculate_vat(sales_df)
-
-        # Calculate Government Levy
-        levy = self.helper.calculate_levy(sales_df)
+        # Calculate the sales metrics (sub-categories, guests, service charge, complimentary covers,
+        # bar only covers, VAT and Government Levy) from a single order level pass.
+        sales_metrics = self.helper.calculate_sales_metrics(sales_df, self.restaurant_abrv == "CDP")
 
         # Put it all together!
 
         result_dict['PAYMENT_TYPE'] = spent_by_payment_type
         result_dict['SESSION_TYPE'] = spent_by_session_type
-        result_dict['SUB_CATEGORY'] = spent_by_sub_categories
-        result_dict['GUESTS'] = guests_by_meal_type
-        result_dict['COMPLIMENTARY_COVERS'] = complimentary_covers
-        result_dict["BAR_ONLY"] = bar_only_covers
-        result_dict['SERVICE'] = service_charge
-        result_dict['VAT'] = vat
-        result_dict['LEVY'] = levy
+        result_dict.update(sales_metrics)
 
         return result_dict
 
@@ -149,62 +288,188 @@ class ReportGenerator:
             str: The path to the generated workbook.
         """
         # Establish a string for the current week. Example: 31_Feb_to_6_Jan_Report.xlsx
-        template_path = f"{self.root}/scripts/Report_Templates/{self.restaurant_name.replace(' ', '_')}_Sales_Report_Template.xlsx"
-        
         report_filename = generic.get_report_filename(self.date, self.restaurant_name, self.restaurant_abrv, self.root)
 
-        controller : ExcelController | None = None
-        
+        # Fill the day's sheet and save the workbook, unless the existing file is already up to date.
+        # Concurrent generations for the same week are merged into the same save, instead of overwriting each other.
+        WorkbookWriter.update(report_filename, lambda: self.open_report_workbook(report_filename), lambda controller: self.fill_daily_sheet(controller, data))
+
+        # Return the path to the workbook
+        return report_filename
+
+    def open_report_workbook(self, report_filename: str) -> ExcelController:
+        """
+        Opens the weekly report workbook, or creates it from the restaurant's template if it does not exist yet.
+
+        Parameters:
+            report_filename (str): The path to the weekly report workbook.
+
+        Returns:
+            ExcelController: The controller for the weekly workbook.
+        """
         # Load the workbook for the week, or create from template
         if self.helper.validate_file_exists(report_filename, False):
-            controller = self.helper.create_excel_controller(report_filename)
-        else:
-            controller = self.helper.create_excel_controller(template_path)
+            return self.helper.create_excel_controller(report_filename)
+        return self.helper.create_excel_controller(self.get_template_path(), True)
+
+    def get_template_path(self) -> str:
+        """
+        Gets the path to the restaurant's report template.
 
+        Returns:
+            str: The path to the template.
+        """
+        return f"{self.root}/scripts/Report_Templates/{self.restaurant_name.replace(' ', '_')}_Sales_Report_Template.xlsx"
+
+    def fill_daily_sheet(self, controller: ExcelController, data: dict) -> int:
+        """
+        Fills the sheet for the generator's date in the weekly workbook, without saving it.
+
+        Parameters:
+            controller (ExcelController): The controller for the weekly workbook.
+            data (dict): A dictionary containing various data for the report.
+
+        Returns:
+            int: The number of cells that were changed.
+        """
+        sheet_name, cells = self.get_daily_cells(data)
+
+        controller.change_sheet(sheet_name)
+
+        # Add the data to their correct fields, leaving the cells that already hold them untouched.
+        return controller.write_cells(dict(cells))
+
+    def get_daily_cells(self, data: dict) -> tuple[str, list[tuple[str, object]]]:
+        """
+        Gets the cells the generator's date fills in the weekly workbook.
+
+        Parameters:
+            data (dict): A dictionary containing various data for the report.
+
+        Returns:
+            tuple[str, list[tuple[str, object]]]: The name of the day's sheet, and a list of (cell, value) pairs to write into it.
+        """
         # Get the correct day for the sheet name
         report_day = generic.diff_days(self.date, 1)
         sheet_name = report_day.strftime("%a").upper()
 
-        controller.change_sheet(sheet_name)
+        # Get the Spreadsheet Format, compiled into the cells to write
+        layout = ReportLayout.get_layout(f'{self.root}/scripts/Report_Format.json')
+
+        values = layout.get_values(data, report_day.strftime("%m/%d/%Y"))
+        return sheet_name, layout.resolve(values)
 
-        # Get the Spreadsheet Format
-        form = generic.parse_json_file(f'{self.root}/scripts/Report_Format.json')
+    def store_metrics(self, data: dict) -> None:
+        """
+        Stores the calculated results for the generator's date, so the comp summary can be built without reading the workbook.
 
-        # Add the data to their correct fields
-        ## Set Date
-        controller.insert_data_into_cell(report_day.strftime("%m/%d/%Y"), form['Date'])
+        Parameters:
+            data (dict): A dictionary containing various data for the report.
 
-        ## Fill in the Matrix (Makes use of Sub_Category and Session fields. Prices in Barbados)
-        self.helper.fill_matrix(data['SUB_CATEGORY'], form['Matrix'], controller)
+        Returns:
+            None
+        """
+        self.metrics.store(self.restaurant_name, self.restaurant_abrv, self.date, data)
 
-        ## Set Card Information
-        foreign_currency = self.helper.fill_card_info(data['PAYMENT_TYPE'], form['Cards'], controller)
-        
-        ## Set Foreign Currencies
-        self.helper.fill_foreign_currency(foreign_currency, form['Foreign_Currency'], controller)
+    def get_manifest_inputs(self) -> dict[str, str]:
+        """
+        Gets the files the generator's date is generated from, as recorded in the manifest.
 
-        ## Guest Covers 
-        controller.insert_data_into_cell("Complimentary", form['Guests']['Complimentary_Title'])
-        data['GUESTS']['Complimentary'] = data['COMPLIMENTARY_COVERS']
-        self.helper.fill_guest_covers(data['GUESTS'], form['Guests'], controller)
+        Returns:
+            dict[str, str]: The path of each input, keyed by the kind of input.
+        """
+        return {
+            "Sales": self.get_upload_filepath("Sales"),
+            "Payments": self.get_upload_filepath("Payments"),
+            "Template": self.get_template_path(),
+            "Format": f"{self.root}/scripts/Report_Format.json",
+        }
+
+    def record_generated(self, generators: list["ReportGenerator"], report_filename: str) -> None:
+        """
+        Records the dates of several generators as generated into a workbook in the manifest, and the workbook in the catalog.
 
-        ## Set Bar Only Covers
-        self.helper.fill_bar_only_covers(data['BAR_ONLY'], form['Bar_Only'], controller)
+        Parameters:
+            generators (list[ReportGenerator]): The generators of the dates that were generated.
+            report_filename (str): The path to the workbook they were written to.
 
-        ## Set Government Levy
-        controller.insert_data_into_cell(data['LEVY'], form['Others']['Levy'])
+        Returns:
+            None
+        """
+        # The inputs are recorded as they were when the generators read them.
+        entries = {generator.date.strftime("%Y%m%d"): self.manifest.create_entry(generator.fingerprints, report_filename) for generator in generators if generator.fingerprints is not None}
+        self.manifest.record(self.restaurant_name, entries)
+        self.catalog.add_report(self.restaurant_name, report_filename)
 
-        # Set VAT
-        controller.insert_data_into_cell(data['VAT'], form['Others']['VAT'])
+    def is_generated(self, manifest: dict | None=None) -> bool:
+        """
+        Checks whether the generator's date has already been generated from its current inputs.
 
-        # Set Service Charge
-        controller.insert_data_into_cell(data['SERVICE'], form['Others']['SERVICE'])
+        Parameters:
+            manifest (dict, optional): The restaurant's loaded manifest, to avoid loading it for every date. Defaults to loading it.
 
-        # Save the workbook to a new file with the previously established filename.
-        controller.save(report_filename)
+        Returns:
+            bool: True if the date does not need to be generated again.
+        """
+        manifest = self.manifest.load(self.restaurant_name) if manifest is None else manifest
+        report_filename = generic.get_report_filename(self.date, self.restaurant_name, self.restaurant_abrv, self.root)
+        return self.manifest.is_current(manifest.get(self.date.strftime("%Y%m%d")), self.get_manifest_inputs(), report_filename)
 
-        # Return the path to the workbook
-        return report_filename
+    def get_daily_metrics(self) -> dict | None:
+        """
+        Gets the calculated results for the generator's date, from the stored metrics, or by calculating them from the uploads.
+
+        Nothing is stored, so reading the metrics never changes what the comp summaries are built from.
+
+        Returns:
+            dict | None: The calculated results, or None if the date has neither stored metrics nor uploads.
+        """
+        data = self.metrics.load(self.restaurant_name, self.restaurant_abrv, self.date)
+        if data is None and self.helper.validate_file_exists(self.get_upload_filepath("Sales"), False):
+            data = self.calculate_daily_results()
+        return data
+
+    def export_metrics(self, start_date: datetime, end_date: datetime, file_path: str | None=None) -> str:
+        """
+        Exports the daily metrics of every date in a range into a single workbook, with one row per day.
+
+        The rows are streamed into a write-only workbook, so memory use does not depend on the length of the range.
+        Dates without data are skipped, and dates that fail are logged and skipped.
+
+        Parameters:
+            start_date (datetime): The first date to export.
+            end_date (datetime): The last date to export.
+            file_path (str, optional): The path to save the export to. Defaults to a file in documents/Exports.
+
+        Returns:
+            str: The path to the exported workbook.
+        """
+        file_path = file_path or f"{self.root}/documents/Exports/{self.restaurant_name.replace(' ', '_')}/{self.restaurant_abrv}_Metrics_{start_date.strftime('%Y%m%d')}_to_{end_date.strftime('%Y%m%d')}.xlsx"
+        makedirs(dirname(file_path) or ".", exist_ok=True)
+
+        layout = ReportLayout.get_layout(f'{self.root}/scripts/Report_Format.json')
+        columns = layout.get_columns()
+
+        def get_rows():
+            yield [" ".join(column) for column in columns]
+
+            date = start_date
+            while date <= end_date:
+                generator = self.for_date(date)
+                date = generic.add_days(date, 1)
+                try:
+                    data = generator.get_daily_metrics()
+                    if data is None:
+                        continue
+                    values = layout.get_values(data, generic.diff_days(generator.date, 1).strftime("%m/%d/%Y"))
+                except Exception as e:
+                    Logger.error(f"Unable to export metrics for {generator.date} for {self.restaurant_name}. More details: {e}")
+                    continue
+                yield [values.get(column) for column in columns]
+
+        count = ExcelController.write_rows(file_path, "Metrics", get_rows())
+        Logger.log(f"Metrics for {count - 1} day(s) exported to {file_path}")
+        return file_path
 
     def update_database(self, data:dict) -> None:
         pass
@@ -5,5 +5,11 @@ from . import custom_exceptions as CustomExceptions
 from .enums import RestaurantNames, PaymentColumnNames, SalesColumnNames
 from .report_generator_helper import ReportGeneratorHelper, ExcelController
 from .logs import Logger
+from .data_cache import DataCache
+from .report_layout import ReportLayout
+from .metrics_store import MetricsStore
+from .workbook_writer import WorkbookWriter
+from .upload_manifest import UploadManifest
+from .upload_catalog import UploadCatalog
 
-__all__ = ["RestaurantNames", "PaymentColumnNames", "SalesColumnNames", "ReportGeneratorHelper", "generic", "ExcelController", "CustomExceptions", "Logger"]
\ No newline at end of file
+__all__ = ["RestaurantNames", "PaymentColumnNames", "SalesColumnNames", "ReportGeneratorHelper", "generic", "ExcelController", "CustomExceptions", "Logger", "DataCache", "ReportLayout", "MetricsStore", "WorkbookWriter", "UploadManifest", "UploadCatalog"]
\ No newline at end of file
@@ -0,0 +1,167 @@
+"""This module is responsible for caching the cleaned Sales and Payments data, so uploads are only parsed once."""
+import os
+from glob import escape, glob
+from hashlib import sha256
+from pandas import DataFrame, read_parquet
+from .logs import Logger
+
+try:
+    import pyarrow
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+class DataCache:
+    """
+    This class stores cleaned DataFrames on disk as Parquet files, keyed by the content of the CSV they were read from.
+
+    Each entry is named after its source file, followed by a hash of the source's contents, the cleaner version and the
+    settings the file is read with, so an entry is only used while the upload, the reader and the cleaning logic are unchanged.
+    Entries for a source file that no longer match it are evicted when that file is next cached.
+    """
+
+    # Whether the missing Parquet support has already been reported, so it is only logged once per process.
+    warned_unavailable: bool = False
+
+    def __init__(self, root: str="..", version: int=1) -> None:
+        """
+        Initializes a new instance of the DataCache class.
+
+        Parameters:
+            root (str, optional): The root folder of the project. Defaults to "..".
+            version (int, optional): The version of the cleaning logic. Changing it invalidates every entry. Defaults to 1.
+
+        Returns:
+            None
+        """
+        self.cache_dir: str = f"{root}/documents/Cache"
+        self.version: int = version
+        self.enabled: bool = PARQUET_AVAILABLE
+
+        if not self.enabled and not DataCache.warned_unavailable:
+            DataCache.warned_unavailable = True
+            Logger.warning("The cleaned-data cache is disabled because pyarrow is not installed, so every upload is parsed again. Install it with pipenv install.")
+
+    def get_digest(self, filepath: str, settings: str="") -> str:
+        """
+        Hashes the contents of a file together with the cleaner version and the settings it is read with.
+
+        Args:
+            filepath (str): The path to the source file.
+            settings (str, optional): A description of how the file is read, such as its columns and dtypes. Defaults to "".
+
+        Returns:
+            str: The hex digest identifying this version of the file.
+        """
+        digest = sha256(f"v{self.version}:{settings}:".encode())
+        with open(filepath, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()[:32]
+
+    def get_entry_prefix(self, filepath: str) -> str:
+        """
+        Gets the path prefix shared by every cache entry of a source file.
+
+        Args:
+            filepath (str): The path to the source file.
+
+        Returns:
+            str: The path prefix, made up of the source's parent folder and name.
+        """
+        folder = os.path.basename(os.path.dirname(os.path.abspath(filepath)))
+        name = os.path.splitext(os.path.basename(filepath))[0]
+        return f"{self.cache_dir}/{folder}/{name}"
+
+    def get_entry_path(self, filepath: str, digest: str) -> str:
+        """
+        Gets the path of the cache entry for a given version of a source file.
+
+        Args:
+            filepath (str): The path to the source file.
+            digest (str): The digest of the source file, from get_digest.
+
+        Returns:
+            str: The path of the cache entry.
+        """
+        return f"{self.get_entry_prefix(filepath)}.{digest}.parquet"
+
+    def load(self, filepath: str, digest: str) -> DataFrame | None:
+        """
+        Loads the cached DataFrame for a source file, if its contents have been cached before.
+
+        Args:
+            filepath (str): The path to the source file.
+            digest (str): The digest of the source file, from get_digest.
+
+        Returns:
+            DataFrame | None: The cached DataFrame, or None if there is no valid entry.
+        """
+        if not self.enabled:
+            return None
+
+        entry_path = self.get_entry_path(filepath, digest)
+        if not os.path.exists(entry_path):
+            return None
+
+        try:
+            df = read_parquet(entry_path)
+        except Exception as e:
+            Logger.warning(f"Discarding unreadable cache entry {entry_path}. More details: {e}")
+            self.evict(filepath)
+            return None
+
+        Logger.log(f"Loaded cached data for {filepath}")
+        return df
+
+    def store(self, filepath: str, df: DataFrame, digest: str) -> None:
+        """
+        Stores the DataFrame for a source file, replacing any stale entries for that file.
+
+        Args:
+            filepath (str): The path to the source file.
+            df (DataFrame): The DataFrame to be cached.
+            digest (str): The digest the source file had when it was read, from get_digest.
+
+        Returns:
+            None
+        """
+        if not self.enabled:
+            return None
+
+        entry_path = self.get_entry_path(filepath, digest)
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+
+        # Write to a temporary file first, so other processes never read a partially written entry.
+        temp_path = f"{entry_path}.{os.getpid()}.tmp"
+        try:
+            df.to_parquet(temp_path)
+            os.replace(temp_path, entry_path)
+        except Exception as e:
+            Logger.warning(f"Unable to cache data for {filepath}. More details: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return None
+
+        self.evict(filepath, keep=entry_path)
+        return None
+
+    def evict(self, filepath: str, keep: str | None=None) -> None:
+        """
+        Removes the cache entries of a source file.
+
+        Args:
+            filepath (str): The path to the source file.
+            keep (str, optional): The path of an entry that should not be removed. Defaults to None.
+
+        Returns:
+            None
+        """
+        for entry_path in glob(f"{escape(self.get_entry_prefix(filepath))}.*.parquet"):
+            if os.path.normpath(entry_path) == os.path.normpath(keep or ""):
+                continue
+            try:
+                os.remove(entry_path)
+            except FileNotFoundError:
+                pass
+        return None
@@ -98,6 +98,36 @@ class SalesColumnNames(Enum):
     TAX = "Sale Tax"
     DISCOUNT = "Sale Disc. %"
 
+    @staticmethod
+    def get_csv_columns() -> list:
+        """
+        Retrieves the columns that are read from the Sales spreadsheet.
+
+        Returns:
+            list: The names of the columns to be read. Any other column in the spreadsheet is ignored.
+        """
+        return [column.value for column in SalesColumnNames]
+
+    @staticmethod
+    def get_dtypes() -> dict:
+        """
+        Retrieves the types that the columns of the Sales spreadsheet should be read as.
+
+        Returns:
+            dict: A dictionary where the keys are the column names and the values are their dtypes.
+                Columns that are not included are left for pandas to infer.
+        """
+        return {
+            SalesColumnNames.SESSION.value: "category",
+            SalesColumnNames.CATEGORY.value: "category",
+            SalesColumnNames.GUESTS.value: "Int64",
+            SalesColumnNames.AMOUNT.value: "float64",
+            SalesColumnNames.LEVY.value: "float64",
+            SalesColumnNames.VAT.value: "float64",
+            SalesColumnNames.TAX.value: "float64",
+            SalesColumnNames.DISCOUNT.value: "float64",
+        }
+
 class PaymentColumnNames(Enum):
     """
     An enum for the column names used in the Payment spreadsheet.
@@ -113,4 +143,34 @@ class PaymentColumnNames(Enum):
     CURRENCY = "Curr."
     EXCHANGE = "Exch"
     GROSS = "Order Gross"
-    SESSION = "Session"
\ No newline at end of file
+    SESSION = "Session"
+
+    @staticmethod
+    def get_csv_columns() -> list:
+        """
+        Retrieves the columns that are read from the Payments spreadsheet.
+        The Session column is created while cleaning the payments, so it is not read.
+
+        Returns:
+            list: The names of the columns to be read. Any other column in the spreadsheet is ignored.
+        """
+        return [column.value for column in PaymentColumnNames if column is not PaymentColumnNames.SESSION]
+
+    @staticmethod
+    def get_dtypes() -> dict:
+        """
+        Retrieves the types that the columns of the Payments spreadsheet should be read as.
+
+        Returns:
+            dict: A dictionary where the keys are the column names and the values are their dtypes.
+                Columns that are not included are left for pandas to infer.
+        """
+        return {
+            PaymentColumnNames.STORE.value: "category",
+            PaymentColumnNames.DATE.value: "string",
+            PaymentColumnNames.PAYMENT_TYPE.value: "category",
+            PaymentColumnNames.AMOUNT.value: "float64",
+            PaymentColumnNames.CURRENCY.value: "category",
+            PaymentColumnNames.EXCHANGE.value: "float64",
+            PaymentColumnNames.GROSS.value: "float64",
+        }
@@ -1,27 +1,126 @@
 """This module is responsible for the manipulation of workbooks."""
+import os
 import openpyxl
 import openpyxl.styles
 import openpyxl.styles.builtins
-import xlwings
-from copy import copy
+from copy import copy, deepcopy
+from numbers import Number
+from os.path import abspath, basename, dirname, exists, getmtime
+from threading import Lock, get_ident
+from typing import Iterable
+from openpyxl.utils.indexed_list import IndexedList
+from .formula_evaluator import FormulaEvaluator
 
 class ExcelController:
     """This class is responsible for the manipulation of workbooks."""
 
-    def __init__(self, file_path: str, data_only=False) -> None:
+    # Parsed template workbooks, keyed by path, along with the modification time they were parsed at.
+    template_pool: dict[str, tuple[float, openpyxl.Workbook]] = {}
+    template_pool_lock: Lock = Lock()
+
+    def __init__(self, file_path: str, data_only=False, workbook: openpyxl.Workbook | None=None, use_excel=False) -> None:
         """
         Initializes a new instance of the ExcelController class.
 
         Parameters:
             file_path (str): The path to the Excel file.
+            data_only (bool, optional): Whether to read the values of formulas instead of the formulas themselves. Defaults to False.
+            workbook (openpyxl.Workbook, optional): An already loaded workbook to use instead of loading the file. Defaults to None.
+            use_excel (bool, optional): Whether to recalculate the formulas with Excel through xlwings, instead of evaluating them in process. Defaults to False.
 
         Returns:
             None
         """
         self.file_path: str = file_path
-        self.workbook : openpyxl.Workbook = self.load_workbook(file_path, data_only)
+        self.evaluator: FormulaEvaluator | None = None
+
+        if data_only and not use_excel:
+            # The formulas are kept, and evaluated when read, so no Excel installation is needed.
+            self.workbook: openpyxl.Workbook = workbook or self.load_workbook(file_path)
+            self.evaluator = FormulaEvaluator(self.workbook)
+        else:
+            self.workbook: openpyxl.Workbook = workbook or self.load_workbook(file_path, data_only)
         self.sheet = self.workbook.active
 
+    @staticmethod
+    def from_template(file_path: str) -> "ExcelController":
+        """
+        Creates an ExcelController for a copy of a template workbook.
+        Each template is only parsed once per process (or again once it is modified), and every controller gets its own copy.
+
+        Args:
+            file_path (str): The path to the template.
+
+        Returns:
+            ExcelController: A controller for a fresh copy of the template.
+        """
+        return ExcelController(file_path, workbook=ExcelController.clone_workbook(ExcelController.get_template(file_path)))
+
+    @staticmethod
+    def get_template(file_path: str) -> openpyxl.Workbook:
+        """
+        Gets the parsed template from the pool, parsing it if it has not been parsed yet, or if it has been modified since.
+        The returned workbook is shared, and should only be copied with clone_workbook.
+
+        Args:
+            file_path (str): The path to the template.
+
+        Returns:
+            openpyxl.Workbook: The parsed template.
+        """
+        key = abspath(file_path)
+        mtime = getmtime(key)
+
+        with ExcelController.template_pool_lock:
+            pooled = ExcelController.template_pool.get(key)
+            if pooled is None or pooled[0] != mtime:
+                pooled = (mtime, openpyxl.load_workbook(key))
+                ExcelController.template_pool[key] = pooled
+
+        return pooled[1]
+
+    @staticmethod
+    def clone_workbook(workbook: openpyxl.Workbook) -> openpyxl.Workbook:
+        """
+        Creates an independent copy of a workbook, without saving and parsing it again.
+
+        Args:
+            workbook (openpyxl.Workbook): The workbook to be copied.
+
+        Returns:
+            openpyxl.Workbook: The copy of the workbook.
+        """
+        # deepcopy restores an IndexedList's lookup table before its items, which leaves the copy empty.
+        # The style tables are therefore copied by hand, and shared with the rest of the copy through the memo.
+        memo = {}
+        for value in vars(workbook).values():
+            if isinstance(value, IndexedList):
+                memo[id(value)] = IndexedList(deepcopy(list(value), memo))
+        return deepcopy(workbook, memo)
+
+    @staticmethod
+    def write_rows(file_path: str, sheet_name: str, rows: Iterable[list]) -> int:
+        """
+        Writes rows into a new workbook as they are produced, using a write-only workbook so memory does not grow with the number of rows.
+
+        Args:
+            file_path (str): The path to save the workbook to.
+            sheet_name (str): The name of the sheet to write the rows into.
+            rows (Iterable[list]): The rows to write, in order. They are consumed lazily.
+
+        Returns:
+            int: The number of rows written.
+        """
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = workbook.create_sheet(sheet_name)
+
+        count = 0
+        for row in rows:
+            sheet.append(row)
+            count += 1
+
+        workbook.save(file_path)
+        return count
 
     def load_workbook(self, file_path: str, data_only=False) -> openpyxl.Workbook:
         """
@@ -48,6 +147,8 @@ class ExcelController:
         Returns:
             None
         """
+        import xlwings
+
         app = xlwings.App(visible=False)
         book = app.books.open(file_path)
         book.save()
@@ -66,17 +167,25 @@ class ExcelController:
         """
         self.sheet = self.workbook[sheet_name]
 
-    def insert_col(self, idx:int) -> None:
+    def insert_col(self, idx:int, amount: int=1) -> None:
         """
-        Inserts a column in the workbook.
+        Inserts columns in the workbook.
 
         Args:
-            col (str): The column to be inserted.
+            idx (int): The index the columns are inserted at, starting from 1.
+            amount (int, optional): The number of columns to insert. Defaults to 1.
 
         Returns:
             None
         """
-        self.sheet.insert_cols(idx)
+        self.sheet.insert_cols(idx, amount)
+
+        # openpyxl moves the cells but not the merged ranges, which would then cover, and blank, the moved titles.
+        for merged in self.sheet.merged_cells.ranges:
+            if merged.min_col >= idx:
+                merged.shift(col_shift=amount)
+            elif merged.max_col >= idx:
+                merged.expand(right=amount)
 
     def insert_data_into_cell(self, data: int | str | float, cell: str) -> None:
         """
@@ -94,6 +203,48 @@ class ExcelController:
         #     self.sheet[cell] = prev_value + data
         # else:
         self.sheet[cell] = data
+        if self.evaluator is not None:
+            self.evaluator.clear_cache()
+
+    def write_cells(self, values: dict[str, object]) -> int:
+        """
+        Writes several values into the active sheet, skipping the cells that already hold the same value.
+
+        Args:
+            values (dict[str, object]): The values to write, keyed by cell address.
+
+        Returns:
+            int: The number of cells that were changed.
+        """
+        changed = 0
+        for cell, data in values.items():
+            target = self.sheet[cell]
+            if ExcelController.is_same_value(target.value, data):
+                continue
+            target.value = data
+            changed += 1
+
+        if changed and self.evaluator is not None:
+            self.evaluator.clear_cache()
+        return changed
+
+    @staticmethod
+    def is_same_value(current: object, data: object) -> bool:
+        """
+        Checks whether a cell's value matches the value about to be written into it.
+        Numbers are compared by value, to the 15 significant digits a workbook stores, so a number read back from the file
+        matches the (numpy) number it was written from.
+
+        Args:
+            current (object): The value in the cell.
+            data (object): The value to be written.
+
+        Returns:
+            bool: True if writing the value would not change the cell.
+        """
+        if isinstance(current, Number) and isinstance(data, Number) and not isinstance(current, bool) and not isinstance(data, bool):
+            return current == data or f"{current:.15g}" == f"{data:.15g}"
+        return type(current) is type(data) and current == data
 
     def read_from_cell(self, cell:str) -> str:
         """
@@ -103,13 +254,31 @@ class ExcelController:
             cell (str): The cell address to read data from. Should be in the format "A1".
 
         Returns:
-            str: The data read from the cell.
+            str: The data read from the cell. Formulas are evaluated when the workbook was opened with data_only.
         """
+        if self.evaluator is not None:
+            return self.evaluator.evaluate(self.sheet.title, cell)
         return self.sheet[cell].value
 
+    def read_row(self, row: int, start_col: int=1) -> list:
+        """
+        Reads the values of a row in the workbook, up to the last used column of the sheet.
+
+        Args:
+            row (int): The row to read, starting from 1.
+            start_col (int, optional): The column to start reading from, starting from 1. Defaults to 1.
+
+        Returns:
+            list: The values of the row, starting from start_col.
+        """
+        if self.sheet.max_column < start_col:
+            return []
+        return list(next(self.sheet.iter_rows(min_row=row, max_row=row, min_col=start_col, values_only=True)))
+
     def save(self, filename: str) -> None:
         """
         Saves the workbook to a file.
+        The workbook is written to a temporary file first, which then replaces the file, so the file is never left partially written.
 
         Args:
             filename (str): The name of the file to save the workbook to.
@@ -117,11 +286,68 @@ class ExcelController:
         Returns:
             None
         """
-        self.workbook.save(filename)
+        temp_path = f"{dirname(abspath(filename))}/.{basename(filename)}.{os.getpid()}.{get_ident()}.tmp"
+        try:
+            self.workbook.save(temp_path)
+            os.replace(temp_path, filename)
+        except Exception:
+            if exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def copy_cell_styles(self, cells: dict[str, str]) -> int:
+        """
+        Copies the fill and font of several cells in the active sheet, skipping the cells that already have them.
+        The workbook keeps a single entry for equal fills and fonts, so the copies do not add new style entries.
+
+        Args:
+            cells (dict[str, str]): The source cell of each destination cell, keyed by the destination cell.
+
+        Returns:
+            int: The number of cells whose style was changed.
+        """
+        changed = 0
+        for dest_cell, source_cell in cells.items():
+            # The cells' fill and font are read-only proxies, which only compare equal to the styles they wrap.
+            fill, font = copy(self.sheet[source_cell].fill), copy(self.sheet[source_cell].font)
+            dest = self.sheet[dest_cell]
+
+            if dest.fill != fill or dest.font != font:
+                dest.fill, dest.font = fill, font
+                changed += 1
+        return changed
 
-    def copy_cell_style_to(self, source_cell, dest_cell:str) -> None:
-        self.sheet[dest_cell].fill = copy(self.sheet[source_cell].fill)
-        self.sheet[dest_cell].font = copy(self.sheet[source_cell].font)
+    def make_cells_accounting(self, cells: list[str]) -> int:
+        """
+        Applies the Currency style to several cells in the active sheet, skipping the cells that already have it.
+
+        Args:
+            cells (list[str]): The cell addresses.
 
-    def make_cell_accounting(self, cell:str):
-        self.sheet[cell].style = "Currency"
\ No newline at end of file
+        Returns:
+            int: The number of cells whose style was changed.
+        """
+        changed = 0
+        for cell in cells:
+            if self.sheet[cell].style != "Currency":
+                self.sheet[cell].style = "Currency"
+                changed += 1
+        return changed
+
+    def format_cells(self, cells: list[str], number_format: str) -> int:
+        """
+        Applies a number format to several cells in the active sheet, skipping the cells that already have it.
+
+        Args:
+            cells (list[str]): The cell addresses.
+            number_format (str): The Excel number format, such as "mm/dd/yyyy".
+
+        Returns:
+            int: The number of cells whose format was changed.
+        """
+        changed = 0
+        for cell in cells:
+            if self.sheet[cell].number_format != number_format:
+                self.sheet[cell].number_format = number_format
+                changed += 1
+        return changed
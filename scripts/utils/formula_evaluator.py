@@ -0,0 +1,492 @@
+"""This module is responsible for evaluating the formulas in the report workbooks, without needing Excel to recalculate them."""
+import re
+from decimal import ROUND_HALF_UP, Context, Decimal
+import openpyxl
+from openpyxl.utils.cell import column_index_from_string, coordinate_from_string, range_boundaries
+
+# Error values, as Excel would display them.
+DIV_ZERO = "#DIV/0!"
+VALUE_ERROR = "#VALUE!"
+NAME_ERROR = "#NAME?"
+REF_ERROR = "#REF!"
+ERRORS = {DIV_ZERO, VALUE_ERROR, NAME_ERROR, REF_ERROR, "#N/A", "#NUM!", "#NULL!"}
+
+CELL = r"\$?[A-Z]{1,3}\$?[0-9]+"
+SHEET = r"(?:'(?:[^']|'')+'|[A-Za-z_][A-Za-z0-9_\.]*)!"
+
+TOKEN_PATTERN = re.compile(rf"""\s*(?:
+    (?P<func>[A-Z][A-Z0-9\.]*)\(
+  | (?P<bool>TRUE|FALSE)\b
+  | (?P<ref>(?:{SHEET})?{CELL}(?::{CELL})?)
+  | (?P<number>[0-9]+(?:\.[0-9]*)?(?:[eE][+-]?[0-9]+)?|\.[0-9]+)
+  | (?P<string>"(?:[^"]|"")*")
+  | (?P<op><>|<=|>=|[-+*/^&=<>(),%])
+)""", re.VERBOSE)
+
+class FormulaEvaluator:
+    """
+    This class evaluates the formulas of a workbook loaded with its formulas, so their values can be read in process.
+
+    Only the parts of the formula language used by the report templates are supported: numbers, strings, cell and range references
+    (including references to other sheets), the arithmetic, comparison and concatenation operators, and the SUM, IF, MIN, MAX,
+    AVERAGE, ROUND and ABS functions. Values are evaluated on demand, and cached for the lifetime of the evaluator.
+    """
+
+    def __init__(self, workbook: openpyxl.Workbook) -> None:
+        """
+        Initializes a new instance of the FormulaEvaluator class.
+
+        Parameters:
+            workbook (openpyxl.Workbook): The workbook to evaluate, loaded with data_only=False.
+
+        Returns:
+            None
+        """
+        self.workbook: openpyxl.Workbook = workbook
+        self.values: dict[tuple[str, int, int], object] = {}
+        self.overrides: dict[tuple[str, int, int], object] = {}
+        self.parsed: dict[str, tuple] = {}
+        self.evaluating: set[tuple[str, int, int]] = set()
+
+    def evaluate(self, sheet_name: str, cell: str) -> object:
+        """
+        Gets the value of a cell, evaluating its formula if it has one.
+
+        Args:
+            sheet_name (str): The name of the sheet the cell is in.
+            cell (str): The cell address, in the format "A1".
+
+        Returns:
+            object: The value of the cell, or an Excel error string such as "#DIV/0!".
+        """
+        column, row = coordinate_from_string(cell.replace("$", ""))
+        return self.get_value(sheet_name, row, column_index_from_string(column))
+
+    def set_value(self, sheet_name: str, cell: str, value: object) -> None:
+        """
+        Overrides the value of a cell for the evaluation, without modifying the workbook.
+
+        Args:
+            sheet_name (str): The name of the sheet the cell is in.
+            cell (str): The cell address, in the format "A1".
+            value (object): The value the cell should evaluate to.
+
+        Returns:
+            None
+        """
+        return self.seed(sheet_name, {cell: value})
+
+    def seed(self, sheet_name: str, values: dict[str, object]) -> None:
+        """
+        Overrides the values of several cells of a sheet for the evaluation, without modifying the workbook.
+
+        Args:
+            sheet_name (str): The name of the sheet the cells are in.
+            values (dict[str, object]): The value each cell should evaluate to, keyed by cell address in the format "A1".
+
+        Returns:
+            None
+        """
+        for cell, value in values.items():
+            column, row = coordinate_from_string(cell.replace("$", ""))
+            self.overrides[(sheet_name, row, column_index_from_string(column))] = value
+        self.clear_cache()
+        return None
+
+    def clear_cache(self) -> None:
+        """
+        Forgets every evaluated value, so they are evaluated again after the workbook or the overrides change.
+
+        Returns:
+            None
+        """
+        self.values.clear()
+        return None
+
+    def get_value(self, sheet_name: str, row: int, col: int) -> object:
+        """
+        Gets the value of a cell by its row and column, evaluating its formula if it has one.
+
+        Args:
+            sheet_name (str): The name of the sheet the cell is in.
+            row (int): The row of the cell.
+            col (int): The column of the cell.
+
+        Returns:
+            object: The value of the cell, or an Excel error string.
+        """
+        key = (sheet_name, row, col)
+        if key in self.values:
+            return self.values[key]
+
+        if key in self.overrides:
+            return self.overrides[key]
+
+        if sheet_name not in self.workbook.sheetnames:
+            return REF_ERROR
+
+        # Cells are looked up without creating them, so evaluating never modifies the workbook.
+        cell = self.workbook[sheet_name]._cells.get((row, col))
+        value = getattr(cell, "value", None)
+        value = getattr(value, "text", value)  # Array formulas hold their formula in text.
+
+        if isinstance(value, str) and value.startswith("=") and len(value) > 1:
+            # Circular references are reported as errors instead of recursing forever.
+            if key in self.evaluating:
+                return REF_ERROR
+
+            self.evaluating.add(key)
+            try:
+                result = self.evaluate_node(self.parse(value[1:]), sheet_name)
+                if isinstance(result, list):
+                    result = VALUE_ERROR
+                value = 0 if result is None else result
+            finally:
+                self.evaluating.discard(key)
+
+        self.values[key] = value
+        return value
+
+    def parse(self, formula: str) -> tuple:
+        """
+        Parses a formula into a tree of nodes, reusing the tree of any identical formula parsed before.
+
+        Args:
+            formula (str): The formula, without its leading "=".
+
+        Returns:
+            tuple: The root node of the parsed formula.
+        """
+        if formula not in self.parsed:
+            self.parsed[formula] = FormulaParser(formula).parse()
+        return self.parsed[formula]
+
+    def evaluate_node(self, node: tuple, sheet_name: str) -> object:
+        """
+        Evaluates a node of a parsed formula.
+
+        Args:
+            node (tuple): The node to evaluate.
+            sheet_name (str): The sheet the formula is in, used for references without a sheet.
+
+        Returns:
+            object: The value of the node. Ranges evaluate to lists of values.
+        """
+        kind = node[0]
+
+        if kind == "value":
+            return node[1]
+
+        if kind == "ref":
+            _, ref_sheet, min_col, min_row, max_col, max_row = node
+            ref_sheet = ref_sheet or sheet_name
+            if min_col == max_col and min_row == max_row:
+                return self.get_value(ref_sheet, min_row, min_col)
+            return [self.get_value(ref_sheet, row, col) for row in range(min_row, max_row + 1) for col in range(min_col, max_col + 1)]
+
+        if kind == "unary":
+            value = to_number(self.evaluate_node(node[2], sheet_name))
+            if is_error(value):
+                return value
+            return -value if node[1] == "-" else value
+
+        if kind == "percent":
+            value = to_number(self.evaluate_node(node[1], sheet_name))
+            return value if is_error(value) else value / 100
+
+        if kind == "binary":
+            return self.evaluate_binary(node[1], self.evaluate_node(node[2], sheet_name), self.evaluate_node(node[3], sheet_name))
+
+        if kind == "func":
+            return self.evaluate_function(node[1], node[2], sheet_name)
+
+        return VALUE_ERROR
+
+    def evaluate_binary(self, op: str, left: object, right: object) -> object:
+        """
+        Applies a binary operator to two values.
+
+        Args:
+            op (str): The operator.
+            left (object): The left value.
+            right (object): The right value.
+
+        Returns:
+            object: The result, or an Excel error string.
+        """
+        if isinstance(left, list) or isinstance(right, list):
+            return VALUE_ERROR
+        for value in (left, right):
+            if is_error(value):
+                return value
+
+        if op == "&":
+            return f"{'' if left is None else left}{'' if right is None else right}"
+
+        if op in ("=", "<>", "<", ">", "<=", ">="):
+            return compare(op, left, right)
+
+        left, right = to_number(left), to_number(right)
+        for value in (left, right):
+            if is_error(value):
+                return value
+
+        if op == "+":
+            return left + right
+        if op == "-":
+            return left - right
+        if op == "*":
+            return left * right
+        if op == "/":
+            return DIV_ZERO if right == 0 else left / right
+        if op == "^":
+            try:
+                return left ** right
+            except (ZeroDivisionError, OverflowError):
+                return "#NUM!"
+
+        return VALUE_ERROR
+
+    def evaluate_function(self, name: str, args: list[tuple], sheet_name: str) -> object:
+        """
+        Evaluates a function call.
+
+        Args:
+            name (str): The name of the function.
+            args (list[tuple]): The nodes of the function's arguments.
+            sheet_name (str): The sheet the formula is in.
+
+        Returns:
+            object: The result, or an Excel error string.
+        """
+        if name == "IF":
+            if len(args) not in (2, 3):
+                return VALUE_ERROR
+            condition = self.evaluate_node(args[0], sheet_name)
+            if is_error(condition):
+                return condition
+            condition = to_number(condition)
+            if is_error(condition):
+                return condition
+            if condition:
+                return self.evaluate_node(args[1], sheet_name)
+            return self.evaluate_node(args[2], sheet_name) if len(args) == 3 else False
+
+        if name in ("SUM", "MIN", "MAX", "AVERAGE"):
+            numbers = []
+            for arg in args:
+                value = self.evaluate_node(arg, sheet_name)
+                # Text and blanks in references are ignored, while literal arguments are converted to numbers.
+                if isinstance(value, list):
+                    values = value
+                else:
+                    values = [value] if arg[0] == "ref" else [to_number(value)]
+                for item in values:
+                    if is_error(item):
+                        return item
+                    if isinstance(item, (int, float)) and not isinstance(item, bool):
+                        numbers.append(item)
+
+            if name == "SUM":
+                return sum(numbers)
+            if name == "AVERAGE":
+                return sum(numbers) / len(numbers) if numbers else DIV_ZERO
+            if not numbers:
+                return 0
+            return min(numbers) if name == "MIN" else max(numbers)
+
+        if name in ("ROUND", "ABS"):
+            values = [to_number(self.evaluate_node(arg, sheet_name)) for arg in args]
+            for value in values:
+                if is_error(value):
+                    return value
+            if name == "ABS" and len(values) == 1:
+                return abs(values[0])
+            if name == "ROUND" and len(values) == 2:
+                return excel_round(values[0], int(values[1]))
+            return VALUE_ERROR
+
+        return NAME_ERROR
+
+class FormulaParser:
+    """This class parses a single formula into a tree of nodes, for the FormulaEvaluator."""
+
+    COMPARISONS = ("=", "<>", "<", ">", "<=", ">=")
+
+    def __init__(self, formula: str) -> None:
+        """
+        Initializes a new instance of the FormulaParser class by splitting the formula into tokens.
+
+        Parameters:
+            formula (str): The formula, without its leading "=".
+
+        Returns:
+            None
+        """
+        self.tokens: list[tuple[str, str]] = []
+        self.position: int = 0
+
+        index = 0
+        formula = formula.rstrip()
+        while index < len(formula):
+            match = TOKEN_PATTERN.match(formula, index)
+            if not match or match.end() == index:
+                self.tokens = [("error", NAME_ERROR)]
+                return
+            self.tokens.append((match.lastgroup, match.group(match.lastgroup)))
+            index = match.end()
+
+    def parse(self) -> tuple:
+        """
+        Parses the formula.
+
+        Returns:
+            tuple: The root node of the formula. Formulas that cannot be parsed evaluate to "#NAME?".
+        """
+        try:
+            node = self.parse_comparison()
+            if self.position != len(self.tokens):
+                raise ValueError("Unexpected token")
+            return node
+        except (ValueError, IndexError):
+            return ("value", NAME_ERROR)
+
+    def peek(self) -> tuple[str, str] | None:
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def take(self) -> tuple[str, str]:
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def expect(self, op: str) -> None:
+        if self.take() != ("op", op):
+            raise ValueError(f"Expected {op}")
+
+    def parse_binary(self, ops: tuple, parse_operand) -> tuple:
+        node = parse_operand()
+        while (token := self.peek()) and token[0] == "op" and token[1] in ops:
+            self.take()
+            node = ("binary", token[1], node, parse_operand())
+        return node
+
+    def parse_comparison(self) -> tuple:
+        return self.parse_binary(self.COMPARISONS, self.parse_concat)
+
+    def parse_concat(self) -> tuple:
+        return self.parse_binary(("&",), self.parse_additive)
+
+    def parse_additive(self) -> tuple:
+        return self.parse_binary(("+", "-"), self.parse_multiplicative)
+
+    def parse_multiplicative(self) -> tuple:
+        return self.parse_binary(("*", "/"), self.parse_power)
+
+    def parse_power(self) -> tuple:
+        return self.parse_binary(("^",), self.parse_unary)
+
+    def parse_unary(self) -> tuple:
+        token = self.peek()
+        if token and token[0] == "op" and token[1] in ("+", "-"):
+            self.take()
+            return ("unary", token[1], self.parse_unary())
+        return self.parse_percent()
+
+    def parse_percent(self) -> tuple:
+        node = self.parse_primary()
+        while self.peek() == ("op", "%"):
+            self.take()
+            node = ("percent", node)
+        return node
+
+    def parse_primary(self) -> tuple:
+        kind, text = self.take()
+
+        if kind == "number":
+            return ("value", float(text) if any(c in text for c in ".eE") else int(text))
+        if kind == "string":
+            return ("value", text[1:-1].replace('""', '"'))
+        if kind == "bool":
+            return ("value", text == "TRUE")
+        if kind == "ref":
+            return self.parse_reference(text)
+        if kind == "func":
+            args = []
+            if self.peek() != ("op", ")"):
+                args.append(self.parse_comparison())
+                while self.peek() == ("op", ","):
+                    self.take()
+                    args.append(self.parse_comparison())
+            self.expect(")")
+            return ("func", text, args)
+        if (kind, text) == ("op", "("):
+            node = self.parse_comparison()
+            self.expect(")")
+            return node
+        if kind == "error":
+            return ("value", text)
+
+        raise ValueError(f"Unexpected token {text}")
+
+    @staticmethod
+    def parse_reference(text: str) -> tuple:
+        sheet_name = None
+        if "!" in text:
+            sheet_name, text = text.rsplit("!", 1)
+            if sheet_name.startswith("'"):
+                sheet_name = sheet_name[1:-1].replace("''", "'")
+
+        min_col, min_row, max_col, max_row = range_boundaries(text.replace("$", ""))
+        return ("ref", sheet_name, min_col, min_row, max_col, max_row)
+
+def is_error(value: object) -> bool:
+    """Checks whether a value is an Excel error string."""
+    return isinstance(value, str) and value in ERRORS
+
+def to_number(value: object) -> object:
+    """Converts a value to a number the way Excel does in arithmetic, returning "#VALUE!" when it cannot be converted."""
+    if value is None:
+        return 0
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (int, float)):
+        return value
+    if is_error(value):
+        return value
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return VALUE_ERROR
+    return VALUE_ERROR
+
+def excel_round(value: int | float, digits: int) -> int | float:
+    """Rounds a number the way Excel's ROUND does, halves away from zero, on the 15 significant digits Excel keeps."""
+    # The context is wide enough for any number of digits a float can hold, so quantize never runs out of precision.
+    rounded = float(Decimal(f"{value:.15g}").quantize(Decimal(1).scaleb(-digits), rounding=ROUND_HALF_UP, context=Context(prec=400)))
+    return int(rounded) if isinstance(value, int) else rounded
+
+def compare(op: str, left: object, right: object) -> bool:
+    """Compares two values the way Excel does, where blanks match both 0 and empty text, and text is compared case-insensitively."""
+    if left is None:
+        left = "" if isinstance(right, str) else 0
+    if right is None:
+        right = "" if isinstance(left, str) else 0
+
+    if isinstance(left, str) and isinstance(right, str):
+        left, right = left.lower(), right.lower()
+    elif isinstance(left, str) != isinstance(right, str):
+        # Excel orders all numbers before text.
+        left, right = (1, 0) if isinstance(left, str) else (0, 1)
+
+    if op == "=":
+        return left == right
+    if op == "<>":
+        return left != right
+    if op == "<":
+        return left < right
+    if op == ">":
+        return left > right
+    if op == "<=":
+        return left <= right
+    return left >= right
@@ -1,6 +1,8 @@
 """This module will contain generic utility functions, such as date parsing."""
 
 import openpyxl
+import numpy as np
+from pandas import Series
 from datetime import datetime, timedelta
 from json import load
 
@@ -20,6 +22,19 @@ def get_session_classification(hour: int) -> str:
         return "Lunch"
     else:
         return "Dinner"
+
+def get_session_classifications(hours: Series) -> Series:
+    """
+    Classifies a whole Series of hours at once, following the same rules as get_session_classification.
+
+    Args:
+        hours (Series): The hours to be classified. Missing hours are left as None.
+
+    Returns:
+        Series: The session classification of each hour, which can be "Breakfast", "Lunch", "Dinner" or None.
+    """
+    sessions = np.select([(hours > 4) & (hours < 11), hours < 16], ["Breakfast", "Lunch"], "Dinner")
+    return Series(sessions, index=hours.index, dtype=object).where(hours.notna(), None)
     
 def diff_days(date1: datetime, offset: int) -> datetime:
     return date1 - timedelta(days=offset)
@@ -0,0 +1,130 @@
+"""This module is responsible for persisting the metrics calculated for each daily report, so they can be reused without reading the workbooks."""
+import json
+import os
+from datetime import datetime
+from .logs import Logger
+
+class MetricsStore:
+    """
+    This class stores the results of ReportGenerator.calculations as one JSON file per restaurant and day.
+
+    Each file records the version of the calculations it was made with, and is ignored once that version changes.
+    """
+
+    def __init__(self, root: str="..", version: int=1) -> None:
+        """
+        Initializes a new instance of the MetricsStore class.
+
+        Parameters:
+            root (str, optional): The root folder of the project. Defaults to "..".
+            version (int, optional): The version of the calculations. Changing it invalidates every stored day. Defaults to 1.
+
+        Returns:
+            None
+        """
+        self.metrics_dir: str = f"{root}/documents/Metrics"
+        self.version: int = version
+
+    def get_path(self, restaurant_name: str, restaurant_abrv: str, date: datetime) -> str:
+        """
+        Gets the path of the stored metrics of a restaurant for a day.
+
+        Args:
+            restaurant_name (str): The name of the restaurant.
+            restaurant_abrv (str): The abbreviation of the restaurant.
+            date (datetime): The date of the upload the metrics were calculated from.
+
+        Returns:
+            str: The path of the metrics file.
+        """
+        return f"{self.metrics_dir}/{restaurant_name.replace(' ', '_')}/{restaurant_abrv}-Metrics-{date.strftime('%Y%m%d')}.json"
+
+    def store(self, restaurant_name: str, restaurant_abrv: str, date: datetime, metrics: dict) -> None:
+        """
+        Stores the metrics of a restaurant for a day, replacing any previously stored metrics for that day.
+
+        Args:
+            restaurant_name (str): The name of the restaurant.
+            restaurant_abrv (str): The abbreviation of the restaurant.
+            date (datetime): The date of the upload the metrics were calculated from.
+            metrics (dict): The results of ReportGenerator.calculations.
+
+        Returns:
+            None
+        """
+        path = self.get_path(restaurant_name, restaurant_abrv, date)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        entry = {"version": self.version, "date": date.strftime("%Y-%m-%d"), "metrics": metrics}
+
+        # Write to a temporary file first, so other processes never read a partially written file.
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, "w") as f:
+                json.dump(entry, f, default=MetricsStore.to_json)
+            os.replace(temp_path, path)
+        except Exception as e:
+            Logger.warning(f"Unable to store metrics for {date} for {restaurant_name}. More details: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return None
+
+    def load(self, restaurant_name: str, restaurant_abrv: str, date: datetime) -> dict | None:
+        """
+        Loads the stored metrics of a restaurant for a day.
+
+        Args:
+            restaurant_name (str): The name of the restaurant.
+            restaurant_abrv (str): The abbreviation of the restaurant.
+            date (datetime): The date of the upload the metrics were calculated from.
+
+        Returns:
+            dict | None: The stored metrics, or None if there are none for the current version.
+        """
+        path = self.get_path(restaurant_name, restaurant_abrv, date)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+        except (OSError, ValueError) as e:
+            Logger.warning(f"Discarding unreadable metrics in {path}. More details: {e}")
+            return None
+
+        if entry.get("version") != self.version:
+            return None
+        return entry["metrics"]
+
+    def get_mtime(self, restaurant_name: str, restaurant_abrv: str, date: datetime) -> float | None:
+        """
+        Gets when the metrics of a restaurant for a day were last stored.
+
+        Args:
+            restaurant_name (str): The name of the restaurant.
+            restaurant_abrv (str): The abbreviation of the restaurant.
+            date (datetime): The date of the upload the metrics were calculated from.
+
+        Returns:
+            float | None: The modification time of the metrics file, or None if it does not exist.
+        """
+        path = self.get_path(restaurant_name, restaurant_abrv, date)
+        return os.path.getmtime(path) if os.path.exists(path) else None
+
+    @staticmethod
+    def to_json(value: object) -> object:
+        """
+        Converts the numpy and pandas scalars found in the metrics into plain Python values.
+
+        Args:
+            value (object): The value json could not serialise.
+
+        Returns:
+            object: The plain Python value.
+
+        Raises:
+            TypeError: If the value cannot be converted.
+        """
+        if hasattr(value, "item"):
+            return value.item()
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
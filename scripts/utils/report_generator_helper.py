@@ -1,18 +1,32 @@
 """This module will be responsible for any helper functions used in the report generation process."""
 import openpyxl
 from os.path import exists
-from pandas import DataFrame, isna
-from . import PaymentColumnNames, SalesColumnNames, custom_exceptions, generic
+from pandas import DataFrame, NaT, Series, isna, to_datetime
+from pandas.api.types import is_datetime64_any_dtype
+from . import PaymentColumnNames, SalesColumnNames, generic
 from .excel_controller import ExcelController
 from datetime import datetime
+from typing import Callable
 
 class ReportGeneratorHelper:
     """This class will contain any helper functions used in the report generation process."""
 
+    # Bump whenever clean_sales or clean_payments change, so previously cached data is cleaned again.
+    CLEANER_VERSION = 1
+
+    # Bump whenever the calculations, or the shape of their results, change, so previously stored metrics are calculated again.
+    METRICS_VERSION = 1
+
+    # Payment types that are recorded against another payment type in the report.
+    PAYMENT_TYPE_ALIASES = {"Discover": "Master"}
+
     @staticmethod
     def clean_sales(sales_df_dirty: DataFrame) -> DataFrame:
         """
             Cleans the sales DataFrame by removing prefixes from the Session and Category columns.
+
+        Both columns only hold a handful of distinct values, so each distinct value is cleaned once, and the
+        cleaned columns are stored as categoricals.
         
         Args:
             sales_df_dirty (DataFrame): The DataFrame containing sales data.
@@ -38,7 +52,7 @@ class ReportGeneratorHelper:
             return session.split('-')[1]
         
         session_key = SalesColumnNames.SESSION.value
-        sales_df[session_key] = sales_df[session_key].apply(clean_session)
+        sales_df[session_key] = ReportGeneratorHelper.clean_categorical(sales_df[session_key], clean_session)
 
         # Removing the leading ABBR/Sales/ from Category column.
         # Example: Turning QPB/Sales/Food into Food or None
@@ -58,10 +72,26 @@ class ReportGeneratorHelper:
             else: return "SERVICE"
 
         category_key = SalesColumnNames.CATEGORY.value
-        sales_df[category_key] = sales_df[category_key].apply(clean_category)
+        sales_df[category_key] = ReportGeneratorHelper.clean_categorical(sales_df[category_key], clean_category)
 
         return sales_df
 
+    @staticmethod
+    def clean_categorical(column: Series, cleaner: Callable[[str], str]) -> Series:
+        """
+        Applies a cleaning function to each distinct value of a column, and maps the results back onto every row.
+
+        Args:
+            column (Series): The column to be cleaned.
+            cleaner (Callable[[str], str]): The function used to clean a single value.
+
+        Returns:
+            Series: The cleaned column, as a categorical.
+        """
+        values = column.astype("category")
+        cleaned = {value: cleaner(value) for value in values.cat.categories}
+        return values.map(cleaned).astype("category")
+
     @staticmethod
     def clean_payments(payments_df_dirty: DataFrame) -> DataFrame:
         """
@@ -76,48 +106,50 @@ class ReportGeneratorHelper:
         
         payments_df = payments_df_dirty.copy()
 
-        # Create a Session Column
-        def get_session(date: str) -> str:
-            """
-            Parses the input date string to extract the hour, then uses the hour to classify the session using the get_session_classification function.
+        # Create a Session Column from the hour each order was approved.
+        approved = ReportGeneratorHelper.parse_payment_dates(payments_df[PaymentColumnNames.DATE.value])
+        payments_df[PaymentColumnNames.SESSION.value] = generic.get_session_classifications(approved.dt.hour)
 
-            Args:
-                date (str): The date string to extract the session hour from.
+        # Discover payments are recorded against Master in the report.
+        payment_type_key = PaymentColumnNames.PAYMENT_TYPE.value
+        aliases = ReportGeneratorHelper.PAYMENT_TYPE_ALIASES
+        payments_df[payment_type_key] = ReportGeneratorHelper.clean_categorical(payments_df[payment_type_key], lambda payment_type: aliases.get(payment_type, payment_type))
 
-            Returns:
-                str: The session classification based on the hour extracted from the date.
-            """
-            if isna(date): return None
-            if "PM" in date or "AM" in date:
-                dt = datetime.strptime(date, "%m/%d/%Y %I:%M:%S %p")
-            else:
-                try:
-                    dt = datetime.strptime(date, "%m/%d/%Y %H:%M")
-                except ValueError:
-                    dt = datetime.strptime(date, "%m/%d/%Y")
-
-            hour = dt.hour
-            return generic.get_session_classification(hour)
-        
-        def discover_to_master(payment_type: str) -> str:
-            """
-            Discovers the payment type to be used in the Master File.
+        return payments_df
 
-            Parameters:
-                payment_type (str): The payment type to be used in the Master File.
+    @staticmethod
+    def parse_payment_dates(dates: Series) -> Series:
+        """
+        Parses the Order Approved column of the payments into datetimes.
 
-            Returns:
-                str: The payment type to be used in the Master File.
-            """
+        The exports use one of three formats: "%m/%d/%Y %I:%M:%S %p", "%m/%d/%Y %H:%M" or "%m/%d/%Y". Each row is matched to its
+        format once, and every batch of rows sharing a format is then parsed together.
 
-            if payment_type == "Discover": return "Master"
-            return payment_type
-        
-        payments_df[PaymentColumnNames.SESSION.value] = payments_df[PaymentColumnNames.DATE.value].apply(get_session)
+        Args:
+            dates (Series): The date strings to be parsed.
 
-        payments_df[PaymentColumnNames.PAYMENT_TYPE.value] = payments_df[PaymentColumnNames.PAYMENT_TYPE.value].apply(discover_to_master)
+        Returns:
+            Series: The parsed dates, with NaT where the date is missing.
 
-        return payments_df
+        Raises:
+            ValueError: If a date does not match the format it was detected as.
+        """
+        if is_datetime64_any_dtype(dates):
+            return dates
+
+        parsed = Series(NaT, index=dates.index, dtype="datetime64[ns]")
+        present = dates.notna()
+        text = dates.astype(str)
+
+        has_meridiem = present & (text.str.contains("AM", regex=False) | text.str.contains("PM", regex=False))
+        has_time = present & ~has_meridiem & text.str.contains(":", regex=False)
+        date_only = present & ~has_meridiem & ~has_time
+
+        for date_format, mask in (("%m/%d/%Y %I:%M:%S %p", has_meridiem), ("%m/%d/%Y %H:%M", has_time), ("%m/%d/%Y", date_only)):
+            if mask.any():
+                parsed[mask] = to_datetime(text[mask], format=date_format)
+
+        return parsed
 
     @staticmethod
     def validate_file_exists(filepath: str, error: bool = True) -> bool:
@@ -138,6 +170,39 @@ class ReportGeneratorHelper:
         if error: raise FileNotFoundError("File in filepath: " + filepath + " does not exist")
         return False
     
+    @staticmethod
+    def group_totals(df: DataFrame, keys: list, value_key: str) -> dict:
+        """
+        Sums a column of the DataFrame over one or more grouping columns, and returns the totals as a nested dictionary.
+
+        Groups are kept in the order in which they first appear in the DataFrame, and rows with missing keys are kept.
+
+        Args:
+            df (DataFrame): The DataFrame containing the data to be totalled.
+            keys (list): The column names to group by, outermost first.
+            value_key (str): The column name of the values to be summed.
+
+        Returns:
+            dict: A dictionary nested once per key in `keys`, where the innermost values are the unrounded totals.
+        """
+        totals = {}
+        if df.empty:
+            return totals
+
+        grouped = df.groupby(keys, sort=False, dropna=False, observed=True)[value_key].sum()
+
+        for group, amount in grouped.items():
+            if len(keys) == 1:
+                group = (group,)
+            group = tuple(None if isna(key) else key for key in group)
+
+            target = totals
+            for key in group[:-1]:
+                target = target.setdefault(key, {})
+            target[group[-1]] = amount
+
+        return totals
+
     @staticmethod
     def calculate_total_by_payment_type(payments_df: DataFrame) -> dict:
         """
@@ -151,20 +216,12 @@ class ReportGeneratorHelper:
                 containing the currency as keys and the total amount spent as values.
 
         """
-        payment_totals = {}
-        for _, row in payments_df.iterrows():
-            payment_type = row[PaymentColumnNames.PAYMENT_TYPE.value]
-            amount = row[PaymentColumnNames.AMOUNT.value]
-            currency = row[PaymentColumnNames.CURRENCY.value]
-
-            if payment_type in payment_totals:
-                if currency not in payment_totals[payment_type]:
-                    payment_totals[payment_type][currency] = amount
-                else:
-                    payment_totals[payment_type][currency] += amount
-            else:
-                payment_totals.update({payment_type: {currency: amount}})
-        
+        payment_totals = ReportGeneratorHelper.group_totals(
+            payments_df,
+            [PaymentColumnNames.PAYMENT_TYPE.value, PaymentColumnNames.CURRENCY.value],
+            PaymentColumnNames.AMOUNT.value
+        )
+
         payment_totals = {k: {currency: abs(round(amount, 2)) for currency, amount in v.items()} for k, v in payment_totals.items()}
         return payment_totals
     
@@ -180,139 +237,16 @@ class ReportGeneratorHelper:
             dict: A dictionary where the keys are the session types, and the values are dictionaries 
                 containing the payment types as keys and dictionaries of currency and total amount spent as values.
         """
-        session_totals = {}
-
-        for _, row in payments_df.iterrows():
-            payment_type = row[PaymentColumnNames.PAYMENT_TYPE.value]
-            session = row[PaymentColumnNames.SESSION.value]
-            currency = row[PaymentColumnNames.CURRENCY.value]
-            amount = row[PaymentColumnNames.AMOUNT.value]
-
-            if session in session_totals:
-                if payment_type in session_totals[session]:
-                    if currency not in session_totals[session][payment_type]:
-                        session_totals[session][payment_type][currency] = amount
-                    else:
-                        session_totals[session][payment_type][currency] += amount
-                else:
-                    session_totals[session].update({payment_type: {currency: amount}})
-            else:
-                session_totals.update({session: {payment_type: {currency: amount}}})
+        session_totals = ReportGeneratorHelper.group_totals(
+            payments_df,
+            [PaymentColumnNames.SESSION.value, PaymentColumnNames.PAYMENT_TYPE.value, PaymentColumnNames.CURRENCY.value],
+            PaymentColumnNames.AMOUNT.value
+        )
 
         session_totals = {k: {payment_type: {currency: round(amount, 2) for currency, amount in v.items()} for payment_type, v in session_totals_inner.items()} for k, session_totals_inner in session_totals.items()}
 
         return session_totals
 
-    @staticmethod
-    def calculate_total_by_subcategory(sales_df: DataFrame) -> dict:
-        """
-        Calculate the total amount spent by subcategory.
-
-        Parameters:
-            sales_df (DataFrame): The DataFrame containing sales data.
-
-        Returns:
-            dict: A dictionary where the keys are the session types, and the values are dictionaries 
-                containing the subcategories as keys and the total amount spent as values.
-        """
-        payment_categories = {}
-
-        for _, row in sales_df.iterrows():
-            category = row[SalesColumnNames.CATEGORY.value]
-            session = row[SalesColumnNames.SESSION.value]
-            amount = row[SalesColumnNames.AMOUNT.value]
-
-            if session in payment_categories:
-                if category in payment_categories[session]:
-                    payment_categories[session][category] += amount
-                else:
-                    payment_categories[session].update({category: amount})
-            else:
-                payment_categories.update({session: {category: amount}})
-            
-        payment_categories = {k: {category: round(amount, 2) for category, amount in v.items()} for k, v in payment_categories.items()}
-        
-        return payment_categories
-    
-    @staticmethod
-    def calculate_guests_by_meal_type(sales_df: DataFrame, is_cdp:bool=False) -> dict:
-        """
-        Calculate the number of guests by meal type.
-
-        Parameters:
-            sales_df (DataFrame): The DataFrame containing sales data.
-
-        Returns:
-            dict: A dictionary where the keys are the session types and the values are the total number of guests for each session type.
-        """
-        guests_by_meal = {}
-
-        filtered_df = sales_df.drop_duplicates(SalesColumnNames.ID.value, keep='first')
-
-        for _, row in filtered_df.iterrows():
-            session = row[SalesColumnNames.SESSION.value]
-            guests = row[SalesColumnNames.GUESTS.value]
-
-            if isna(guests):
-                guests = 0
-            
-            if session in guests_by_meal:
-                guests_by_meal[session] += 1 if is_cdp else guests
-            else:
-                guests_by_meal.update({session: 1 if is_cdp else guests})
-
-        return guests_by_meal
-    
-    @staticmethod
-    def calculate_service_charge(sales_df: DataFrame) -> float:
-        """
-        Calculate the total service charge from a DataFrame of sales.
-
-        Args:
-            sales_df (DataFrame): The DataFrame containing sales data.
-
-        Returns:
-            float: The total service charge from the sales DataFrame.
-        """
-
-        total = 0
-        for _, row in sales_df.iterrows():
-            if row[SalesColumnNames.CATEGORY.value] == 'SERVICE':
-                total += row[SalesColumnNames.AMOUNT.value]
-
-        return total
-    
-    @staticmethod
-    def calculate_vat(sales_df: DataFrame) -> float:
-        """
-        Calculate the sum of the VAT column in the given sales DataFrame.
-
-        Args:
-            sales_df (DataFrame): The DataFrame containing sales data.
-
-        Returns:
-            float: The sum of the VAT column in the sales DataFrame. If the VAT column does not exist, returns 0.
-        """
-        if SalesColumnNames.VAT.value in sales_df:
-            return sales_df[SalesColumnNames.VAT.value].sum()
-        return 0
-    
-    @staticmethod
-    def calculate_levy(sales_df: DataFrame) -> float:
-        """
-        Calculates the total levy amount from the sales DataFrame.
-
-        Parameters:
-            sales_df (DataFrame): The DataFrame containing sales data.
-
-        Returns:
-            float: The total levy amount from the sales DataFrame.
-        """
-        if SalesColumnNames.LEVY.value in sales_df:
-            return sales_df[SalesColumnNames.LEVY.value].sum()
-        return 0
-    
-
     @staticmethod
     def calculate_sales_tax(sales_df: DataFrame) -> float:
         """
@@ -329,41 +263,51 @@ class ReportGeneratorHelper:
         return 0
 
     @staticmethod
-    def calculate_complimentary_covers(sales_df: DataFrame) -> int:
+    def calculate_complimentary_covers(sales_df: DataFrame, by_session: bool=False, summary: DataFrame=None) -> int | dict:
         """
         Determines complimentary covers from the sales DataFrame.
         Complimentary covers are the covers where the Sale Disc % field is 100%, for orders that consists of Food only.
 
         Args:
             sales_df (DataFrame): The DataFrame containing sales data.
+            by_session (bool, optional): Whether to break the covers down by the session of each order. Defaults to False.
+            summary (DataFrame, optional): A summary of the sales created by summarise_orders, to avoid summarising them again.
         
         Returns:
-            int: An integer representing the total complimentary covers.
+            int | dict: An integer representing the total complimentary covers, or a dictionary of the complimentary covers
+                for each session if `by_session` is True.
         """
+        if summary is None:
+            summary = ReportGeneratorHelper.summarise_orders(sales_df)
 
-        copy_df: DataFrame = sales_df.copy()
-        copy_df = copy_df.loc[copy_df[SalesColumnNames.DISCOUNT.value] == 100]
-        order_ids = copy_df[SalesColumnNames.ID.value].unique()
+        index = summary.index
+        discounted = (summary[SalesColumnNames.DISCOUNT.value] == 100).to_numpy()
+        is_food = index.get_level_values(SalesColumnNames.CATEGORY.value) == "Food"
 
-        complimentary_covers = 0
-        for order_id in order_ids:
-            categories = []
+        # Decide per order whether it has fully discounted lines, and whether any of them are not Food.
+        orders = DataFrame({
+            "Discounted": discounted,
+            "Not_Food": discounted & ~is_food,
+            SalesColumnNames.SESSION.value: index.get_level_values(SalesColumnNames.SESSION.value),
+        }, index=index.get_level_values(SalesColumnNames.ID.value))
+        orders = orders.groupby(level=0, sort=False).agg({"Discounted": "any", "Not_Food": "any", SalesColumnNames.SESSION.value: "first"})
 
-            for _, row in copy_df.loc[copy_df[SalesColumnNames.ID.value] == order_id].iterrows():
-                category = row[SalesColumnNames.CATEGORY.value]
-                categories.append(category)
-            if all(category == "Food" for category in categories):
-                complimentary_covers += 1
-        
-        return complimentary_covers
+        complimentary = orders["Discounted"] & ~orders["Not_Food"]
+
+        if not by_session:
+            return int(complimentary.sum())
+
+        sessions = orders.loc[complimentary, SalesColumnNames.SESSION.value]
+        return {session: count for session, count in sessions.value_counts(sort=False).items() if count}
     
     @staticmethod
-    def calculate_bar_only_covers(sales_df: DataFrame) -> dict:
+    def calculate_bar_only_covers(sales_df: DataFrame, summary: DataFrame=None) -> dict:
         """
         Calculates the number of bar only covers in the given sales DataFrame.
 
         Args:
             sales_df (DataFrame): The DataFrame containing sales data.
+            summary (DataFrame, optional): A summary of the sales created by summarise_orders, to avoid summarising them again.
 
         Returns:
             dict: A dictionary containing the number of bar only covers for each session type.
@@ -384,219 +328,129 @@ class ReportGeneratorHelper:
             }
         }
 
-        food_order_ids = sales_df.loc[sales_df[SalesColumnNames.CATEGORY.value] == "Food"][SalesColumnNames.ID.value].unique()
-        bar_only_df_all = sales_df.loc[~sales_df[SalesColumnNames.ID.value].isin(food_order_ids)]
-        bar_only_df = bar_only_df_all.drop_duplicates(SalesColumnNames.ID.value, keep='first')
+        if summary is None:
+            summary = ReportGeneratorHelper.summarise_orders(sales_df)
 
-        for _, row in bar_only_df.iterrows():
-            session = row[SalesColumnNames.SESSION.value]
-            target_rows = bar_only_df_all.loc[bar_only_df_all[SalesColumnNames.ID.value] == row[SalesColumnNames.ID.value]]
-            local_money = 0
-
-            for _, target_row in target_rows.iterrows():
-                if target_row[SalesColumnNames.CATEGORY.value] == "SERVICE":
-                    continue
-                local_money += target_row[SalesColumnNames.AMOUNT.value]
-
-            bar_only_covers[session]['Count'] += row[SalesColumnNames.GUESTS.value]
-            bar_only_covers[session]['Sales'] += local_money
-            bar_only_covers[session]['Sales'] = round(bar_only_covers[session]['Sales'], 2)
+        index = summary.index
+        categories = index.get_level_values(SalesColumnNames.CATEGORY.value)
+        session_key = SalesColumnNames.SESSION.value
+        guests_key = SalesColumnNames.GUESTS.value
+
+        # Collapse the summary into one row per order, with its session and guests taken from the first line.
+        orders = DataFrame({
+            "Food": categories == "Food",
+            "Sales": summary[SalesColumnNames.AMOUNT.value].where(categories != "SERVICE", 0).to_numpy(),
+            guests_key: summary[guests_key].to_numpy(),
+            session_key: index.get_level_values(session_key),
+        }, index=index.get_level_values(SalesColumnNames.ID.value))
+        # Guests are taken from the first line even when it has none, the same as the guest totals in calculate_sales_metrics.
+        grouped = orders.groupby(level=0, sort=False)
+        guests = grouped[guests_key].first(skipna=False).fillna(0)
+        orders = grouped.agg({"Food": "any", "Sales": "sum", session_key: "first"})
+        orders[guests_key] = guests
+
+        bar_only = orders.loc[~orders["Food"]]
+        session_totals = bar_only[["Sales", guests_key]].fillna(0).groupby(bar_only[session_key], sort=False, observed=True).sum()
+
+        for session, totals in session_totals.to_dict("index").items():
+            covers = bar_only_covers.setdefault(session, {"Count": 0, "Sales": 0})
+            covers["Count"] = totals[guests_key]
+            covers["Sales"] = round(totals["Sales"], 2)
 
         return bar_only_covers
 
     @staticmethod
-    def create_excel_controller(filepath: str) -> ExcelController:
+    def summarise_orders(sales_df: DataFrame) -> DataFrame:
         """
-        Creates an instance of the ExcelController class.
+        Collapses the sales DataFrame into one row per order, session and category, in a single groupby.
 
-        Parameters:
-            filepath (str): The filepath to the Excel file.
+        The summary holds the summed Sale Net (and VAT and Levy, where present), the guests on the first line of each group,
+        and the highest discount applied to any line in the group. Rows are kept in the order in which they first appear.
 
-        Returns:
-            ExcelController: An instance of the ExcelController class.
-        """
-        return ExcelController(filepath)
-    
-    @staticmethod
-    def parse_cell(data_key: str, cell_info: str | dict, controller: ExcelController) -> str:
-        """
-        Parses a cell in the Excel sheet and returns the cell location.
-
-        Parameters:
-            data_key (str): The key to access the data.
-            cell_info (str | dict): Either the cell reference, or a dictionary containing other meta information
-            controller (ExcelController): The Excel controller to interact with the Excel sheet.
+        Args:
+            sales_df (DataFrame): The DataFrame containing the cleaned sales data.
 
         Returns:
-            str: The cell location.
-
-        Raises:
-            InvalidReportFormatException: If the title format in the Report_Format.json is invalid.
+            DataFrame: The order level summary, indexed by Order ID, Session and Category.
         """
-        if type(cell_info) == dict:
-            if "FIELD" in cell_info:
-                cell_loc = cell_info["FIELD"]
-            if "TITLE" in cell_info:
-                title = cell_info["TITLE"]
-                if type(title) is dict and "VAL" in title and "REF" in title:
-                    controller.insert_data_into_cell(title["VAL"], title["REF"]) 
-                elif type(title) == str:
-                    controller.insert_data_into_cell(data_key, cell_info["TITLE"])
-                else:
-                    raise custom_exceptions.InvalidReportFormatException(f"Invalid title format for {title} in the Report_Format.json. Expected a dictionary with 'VAL' and 'REF', where 'VAL' is a named title, and 'REF' is the cell to store the title in, or a string containing the cell reference.")
-            
-            if "FIELDS" in cell_info:
-                for field_data in cell_info["FIELDS"][:-1]:
-                    cell = ReportGeneratorHelper.parse_cell(data_key, field_data, controller)
-                    if cell:
-                        controller.insert_data_into_cell(cell_info, cell)
-                cell_loc = ReportGeneratorHelper.parse_cell(data_key, cell_info["FIELDS"][-1], controller)
-        if type(cell_info) == str:
-            cell_loc = cell_info
-
-        return cell_loc
-    
-    @staticmethod
-    def fill_matrix(spent_by_sub_category_dict: dict, matrix_form: dict, controller: ExcelController) -> None:
-        """
-        Fills the matrix with data from the spent_by_sub_category_dict using the matrix_form layout and the provided ExcelController.
+        keys = [SalesColumnNames.ID.value, SalesColumnNames.SESSION.value, SalesColumnNames.CATEGORY.value]
+        grouped = sales_df.groupby(keys, sort=False, dropna=False, observed=True)
 
-        Parameters:
-            spent_by_sub_category_dict (dict): A dictionary containing the data to be filled into the matrix.
-            matrix_form (dict): A dictionary defining the structure of the matrix.
-            controller (ExcelController): An instance of the ExcelController class to interact with the Excel sheet.
+        summary = grouped[SalesColumnNames.AMOUNT.value].sum().to_frame()
+        summary[SalesColumnNames.GUESTS.value] = grouped[SalesColumnNames.GUESTS.value].first(skipna=False)
+        summary[SalesColumnNames.DISCOUNT.value] = grouped[SalesColumnNames.DISCOUNT.value].max()
 
-        Returns:
-            None
-        """
+        for key in (SalesColumnNames.VAT.value, SalesColumnNames.LEVY.value):
+            if key in sales_df:
+                summary[key] = grouped[key].sum()
 
-        for session, session_data in spent_by_sub_category_dict.items():
-            row = matrix_form['Rows'][session]
-            for subcategory, cost in session_data.items():
-                if subcategory not in matrix_form['Columns']:
-                    continue
-                col = matrix_form['Columns'][subcategory]
-                cell = ReportGeneratorHelper.parse_cell(subcategory, f"{col}{row}", controller)
-                controller.insert_data_into_cell(cost, cell)
-        return None
-    
-    @staticmethod
-    def fill_card_info(spent_by_payment_type_dict: dict, card_form: dict, controller: ExcelController) -> dict:
-        """
-        Fills the card information based on the spent_by_payment_type_dict, using the card_form layout and the provided ExcelController.
+        return summary
 
-        Parameters:
-            spent_by_payment_type_dict (dict): A dictionary containing the payment type data.
-            card_form (dict): A dictionary defining the structure of the card form.
-            controller (ExcelController): An instance of the ExcelController class to interact with the Excel sheet.
-
-        Returns:
-            dict: A dictionary containing the foreign currency information.
-        """
-        
-        foreign_currency: dict = {}
-
-        for payment_type, payment_data in spent_by_payment_type_dict.items():
-            total = 0
-
-            for currency, amount in payment_data.items():
-                if payment_type != "Cash":
-                    total += amount * generic.get_exch_rate(currency)
-                else:
-                    if currency != "BBD":
-                        if currency in foreign_currency:
-                            foreign_currency[currency] += amount
-                        else:
-                            foreign_currency[currency] = amount
-
-            if payment_type != "Cash":
-                try:
-                    cell = ReportGeneratorHelper.parse_cell(payment_type, card_form[payment_type], controller)
-                    controller.insert_data_into_cell(total, cell)
-                except KeyError:
-                    raise custom_exceptions.UnknownCardTypeException(f"Unknown card type: {payment_type}")
-
-        return foreign_currency
-    
     @staticmethod
-    def fill_foreign_currency(foreign_currency_dict: dict, foreign_currency_form: dict, controller: ExcelController) -> None:
+    def calculate_sales_metrics(sales_df: DataFrame, is_cdp: bool=False) -> dict:
         """
-        Fills the foreign currency information in the Excel sheet using the provided foreign currency dictionary, foreign currency form, and Excel controller.
+        Calculates every sales based metric used in the daily report from a single order level summary of the sales.
 
         Parameters:
-            foreign_currency_dict (dict): A dictionary containing the foreign currency information.
-            foreign_currency_form (dict): A dictionary defining the structure of the foreign currency form.
-            controller (ExcelController): An instance of the ExcelController class to interact with the Excel sheet.
+            sales_df (DataFrame): The DataFrame containing the cleaned sales data.
+            is_cdp (bool, optional): Whether guests should be counted as one per order, as done for Cafe de Paris. Defaults to False.
 
         Returns:
-            None
+            dict: A dictionary containing the SUB_CATEGORY, GUESTS, COMPLIMENTARY_COVERS, BAR_ONLY, SERVICE, VAT and LEVY results.
+                SUB_CATEGORY maps each session to the rounded amount spent per sub category, GUESTS maps each session to its
+                guests, and SERVICE, VAT and LEVY are unrounded totals.
         """
+        id_key = SalesColumnNames.ID.value
+        session_key = SalesColumnNames.SESSION.value
+        category_key = SalesColumnNames.CATEGORY.value
+        amount_key = SalesColumnNames.AMOUNT.value
+        guests_key = SalesColumnNames.GUESTS.value
+
+        summary = ReportGeneratorHelper.summarise_orders(sales_df)
+        order_ids = summary.index.get_level_values(id_key)
+        is_service = summary.index.get_level_values(category_key) == "SERVICE"
+
+        # Amount spent per session and sub category
+        sub_categories = ReportGeneratorHelper.group_totals(summary, [session_key, category_key], amount_key)
+        sub_categories = {k: {category: round(amount, 2) for category, amount in v.items()} for k, v in sub_categories.items()}
+
+        # One row per order, taken from the first line of each order.
+        first_lines = summary.loc[~order_ids.duplicated()]
+        first_sessions = first_lines.index.get_level_values(session_key)
+        first_guests = first_lines[guests_key].fillna(0)
+
+        # Guests by session
+        if is_cdp:
+            guests = first_guests.groupby(first_sessions, sort=False, observed=True).size()
+        else:
+            guests = first_guests.groupby(first_sessions, sort=False, observed=True).sum()
+
+        # Complimentary and Bar Only covers
+        complimentary_covers = ReportGeneratorHelper.calculate_complimentary_covers(sales_df, summary=summary)
+        bar_only_covers = ReportGeneratorHelper.calculate_bar_only_covers(sales_df, summary=summary)
+
+        return {
+            "SUB_CATEGORY": sub_categories,
+            "GUESTS": guests.to_dict(),
+            "COMPLIMENTARY_COVERS": complimentary_covers,
+            "BAR_ONLY": bar_only_covers,
+            "SERVICE": summary.loc[is_service, amount_key].sum(),
+            "VAT": summary[SalesColumnNames.VAT.value].sum() if SalesColumnNames.VAT.value in summary else 0,
+            "LEVY": summary[SalesColumnNames.LEVY.value].sum() if SalesColumnNames.LEVY.value in summary else 0,
+        }
 
-        for currency, amount in foreign_currency_dict.items():
-            cell = foreign_currency_form[currency]
-
-            controller.insert_data_into_cell(amount, cell)
-        
-        return None
-    
     @staticmethod
-    def fill_guest_covers(guests_covers_dict: dict, guests_covers_form: dict, controller: ExcelController) -> None:
+    def create_excel_controller(filepath: str, is_template: bool=False) -> ExcelController:
         """
-        Fills the guest covers in the Excel sheet using the provided guests covers dictionary, guests covers form, and Excel controller.
+        Creates an instance of the ExcelController class.
 
         Parameters:
-            guests_covers_dict (dict): A dictionary containing the guest covers information.
-            guests_covers_form (dict): A dictionary defining the structure of the guests covers form.
-            controller (ExcelController): An instance of the ExcelController class to interact with the Excel sheet.
+            filepath (str): The filepath to the Excel file.
+            is_template (bool, optional): Whether the file is a template, in which case a copy of the pooled template is used. Defaults to False.
 
         Returns:
-            None
-        """
-
-        for session, count in guests_covers_dict.items():
-            cell = guests_covers_form[session]
-            controller.insert_data_into_cell(count, cell)
-
-        return None
-    
-    @staticmethod
-    def fill_bar_only_covers(bar_only_covers_dict: dict, bar_only_covers_form: dict, controller: ExcelController) -> None:
-        """
-        Fills the bar only covers in the Excel sheet using the provided bar only covers dictionary, bar only covers form, and Excel controller.
-
-        Parameters:
-            bar_only_covers_dict (dict): A dictionary containing the bar only covers information.
-            bar_only_covers_form (dict): A dictionary defining the structure of the bar only covers form.
-            controller (ExcelController): An instance of the ExcelController class to interact with the Excel sheet.
-
-        Returns:    
-            None
+            ExcelController: An instance of the ExcelController class.
         """
-
-        headers = ["Session", "Count", "Cost"]
-        header_cells = ["A47", "B47", "C47"]
-
-        for i, header in enumerate(headers):
-            controller.insert_data_into_cell(header, header_cells[i])
-
-        sessions = ["Breakfast", "Lunch", "Dinner"]
-
-        # Setting Titles
-        for session in sessions:
-            key = session + "_Title"
-            cell = bar_only_covers_form[key]
-            controller.insert_data_into_cell(f"{session} (Bar Only)", cell)
-
-        # Setting Counts
-        for session in sessions:
-            key = session + "_Count"
-            cell = bar_only_covers_form[key]
-            controller.insert_data_into_cell(bar_only_covers_dict[session]["Count"], cell)
-
-        # Setting costs
-        for session in sessions:
-            key = session + "_Cost"
-            cell = bar_only_covers_form[key]
-            controller.insert_data_into_cell(bar_only_covers_dict[session]["Sales"], cell)
-
-        return None
\ No newline at end of file
+        if is_template:
+            return ExcelController.from_template(filepath)
+        return ExcelController(filepath)
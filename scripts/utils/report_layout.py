@@ -0,0 +1,346 @@
+"""This module is responsible for loading Report_Format.json, and compiling it into the cell writes used to render a daily report."""
+import re
+from os.path import abspath, getmtime
+from typing import NamedTuple
+from . import custom_exceptions, generic
+from .logs import Logger
+
+CELL_PATTERN = re.compile(r"^[A-Z]{1,3}[1-9][0-9]*$")
+
+SESSIONS = ["Breakfast", "Lunch", "Dinner"]
+
+# Maps the keys of the "Others" section to the calculated results they are filled with.
+OTHERS_KEYS = {"Levy": "LEVY", "VAT": "VAT", "SERVICE": "SERVICE"}
+
+# Sub categories that are reported under the Others section, rather than in the Matrix.
+UNLISTED_SUBCATEGORIES = {"SERVICE"}
+
+# Report formats that have already been loaded, keyed by path, along with the modification time they were loaded at.
+_format_cache: dict[str, tuple] = {}
+
+class CellWrite(NamedTuple):
+    """
+    A single write into the daily sheet.
+
+    The write is made when `key` is None, or when `key` is present in the report values. `value` is written when it is set,
+    otherwise the report value for `key` is written.
+    """
+
+    cell: str
+    key: tuple | None
+    value: str | None = None
+
+class ReportLayout:
+    """
+    This class holds Report_Format.json compiled into a flat list of cell writes per section of the daily sheet.
+
+    Some cells are shared by several keys, such as Food and Finger Food, or Discover and Master. Values are written section
+    by section, and within a section in the order of the calculated results, so the value that comes last wins.
+    """
+
+    SECTIONS = ["Date", "Matrix", "Cards", "Foreign_Currency", "Guests", "Bar_Only", "Others"]
+
+    def __init__(self, form: dict) -> None:
+        """
+        Compiles and validates the report format.
+
+        Parameters:
+            form (dict): The parsed contents of Report_Format.json.
+
+        Returns:
+            None
+
+        Raises:
+            InvalidReportFormatException: If a section is missing, or contains an invalid cell reference or title.
+        """
+        for section in self.SECTIONS:
+            if section not in form:
+                raise custom_exceptions.InvalidReportFormatException(f"Missing the {section} section in the Report_Format.json.")
+
+        self.card_types: set = set(form["Cards"])
+        self.sections: dict[str, list[CellWrite]] = {
+            "Date": [CellWrite(ReportLayout.validate_cell(form["Date"]), ("Date",))],
+            "Matrix": ReportLayout.compile_matrix(form["Matrix"]),
+            "Cards": ReportLayout.compile_cards(form["Cards"]),
+            "Foreign_Currency": [CellWrite(ReportLayout.validate_cell(cell), ("Foreign_Currency", currency)) for currency, cell in form["Foreign_Currency"].items()],
+            "Guests": ReportLayout.compile_guests(form["Guests"]),
+            "Bar_Only": ReportLayout.compile_bar_only(form["Bar_Only"]),
+            "Others": [CellWrite(ReportLayout.validate_cell(cell), ("Others", key)) for key, cell in form["Others"].items()],
+        }
+        self.writes: list[CellWrite] = [write for section in self.SECTIONS for write in self.sections[section]]
+
+        self.fixed_writes: dict[str, list[CellWrite]] = {section: [write for write in self.sections[section] if write.key is None] for section in self.SECTIONS}
+        self.key_writes: dict[tuple, list[CellWrite]] = {}
+        for write in self.writes:
+            if write.key is not None:
+                self.key_writes.setdefault(write.key, []).append(write)
+
+    @staticmethod
+    def load(file_path: str) -> tuple[dict, "ReportLayout"]:
+        """
+        Loads and compiles a report format, reusing the previous result until the file is modified.
+
+        Args:
+            file_path (str): The path to Report_Format.json.
+
+        Returns:
+            tuple[dict, ReportLayout]: The parsed report format, and its compiled layout. The parsed format is shared, and should not be modified.
+        """
+        key = abspath(file_path)
+        mtime = getmtime(key)
+
+        cached = _format_cache.get(key)
+        if cached is not None and cached[0] == mtime:
+            return cached[1], cached[2]
+
+        form = generic.parse_json_file(key)
+        layout = ReportLayout(form)
+        _format_cache[key] = (mtime, form, layout)
+        return form, layout
+
+    @staticmethod
+    def get_format(file_path: str) -> dict:
+        """
+        Gets the parsed report format, loading it only when it has not been loaded yet, or the file has been modified.
+
+        Args:
+            file_path (str): The path to Report_Format.json.
+
+        Returns:
+            dict: The parsed report format. It is shared, and should not be modified.
+        """
+        return ReportLayout.load(file_path)[0]
+
+    @staticmethod
+    def get_layout(file_path: str) -> "ReportLayout":
+        """
+        Gets the compiled layout of the report format, compiling it only when it has not been compiled yet, or the file has been modified.
+
+        Args:
+            file_path (str): The path to Report_Format.json.
+
+        Returns:
+            ReportLayout: The compiled layout.
+        """
+        return ReportLayout.load(file_path)[1]
+
+    @staticmethod
+    def validate_cell(cell: str) -> str:
+        """
+        Validates a cell reference from the report format.
+
+        Args:
+            cell (str): The cell reference, such as "K21".
+
+        Returns:
+            str: The validated cell reference.
+
+        Raises:
+            InvalidReportFormatException: If the cell reference is invalid.
+        """
+        if type(cell) is not str or not CELL_PATTERN.match(cell):
+            raise custom_exceptions.InvalidReportFormatException(f"Invalid cell reference {cell} in the Report_Format.json.")
+        return cell
+
+    @staticmethod
+    def compile_matrix(matrix_form: dict) -> list[CellWrite]:
+        """
+        Compiles the Matrix section into one write per session and sub category.
+
+        Args:
+            matrix_form (dict): The Matrix section of the report format.
+
+        Returns:
+            list[CellWrite]: The compiled writes.
+        """
+        writes = []
+        for subcategory, col in matrix_form["Columns"].items():
+            for session, row in matrix_form["Rows"].items():
+                cell = ReportLayout.validate_cell(f"{col}{row}")
+                writes.append(CellWrite(cell, ("Matrix", session, subcategory)))
+        return writes
+
+    @staticmethod
+    def compile_cards(card_form: dict) -> list[CellWrite]:
+        """
+        Compiles the Cards section into the title and total writes of each payment type.
+
+        Args:
+            card_form (dict): The Cards section of the report format.
+
+        Returns:
+            list[CellWrite]: The compiled writes.
+        """
+        writes = []
+        for payment_type, cell_info in card_form.items():
+            key = ("Cards", payment_type)
+            cell, titles = ReportLayout.compile_cell_info(payment_type, cell_info)
+            writes.extend(CellWrite(title_cell, key, title) for title, title_cell in titles)
+            writes.append(CellWrite(cell, key))
+        return writes
+
+    @staticmethod
+    def compile_cell_info(data_key: str, cell_info: str | dict) -> tuple[str, list[tuple[str, str]]]:
+        """
+        Compiles a cell entry of the report format, with its optional TITLE and nested FIELDS.
+
+        Args:
+            data_key (str): The key the entry belongs to, used as its title when the TITLE is a cell reference.
+            cell_info (str | dict): Either the cell reference, or a dictionary containing other meta information.
+
+        Returns:
+            tuple[str, list[tuple[str, str]]]: The cell the value is written to, and a list of (title, cell) pairs.
+
+        Raises:
+            InvalidReportFormatException: If the title format or cell reference is invalid.
+        """
+        if type(cell_info) == str:
+            return ReportLayout.validate_cell(cell_info), []
+
+        if type(cell_info) != dict:
+            raise custom_exceptions.InvalidReportFormatException(f"Invalid cell format for {data_key} in the Report_Format.json. Expected a cell reference or a dictionary.")
+
+        cell = cell_info.get("FIELD")
+        titles = []
+
+        if "TITLE" in cell_info:
+            title = cell_info["TITLE"]
+            if type(title) is dict and "VAL" in title and "REF" in title:
+                titles.append((title["VAL"], ReportLayout.validate_cell(title["REF"])))
+            elif type(title) == str:
+                titles.append((data_key, ReportLayout.validate_cell(title)))
+            else:
+                raise custom_exceptions.InvalidReportFormatException(f"Invalid title format for {title} in the Report_Format.json. Expected a dictionary with 'VAL' and 'REF', where 'VAL' is a named title, and 'REF' is the cell to store the title in, or a string containing the cell reference.")
+
+        for field_data in cell_info.get("FIELDS", []):
+            cell, field_titles = ReportLayout.compile_cell_info(data_key, field_data)
+            titles.extend(field_titles)
+
+        if cell is None:
+            raise custom_exceptions.InvalidReportFormatException(f"No FIELD or FIELDS given for {data_key} in the Report_Format.json.")
+
+        return ReportLayout.validate_cell(cell), titles
+
+    @staticmethod
+    def compile_guests(guests_form: dict) -> list[CellWrite]:
+        """
+        Compiles the Guests section into the complimentary title, and one write per session.
+
+        Args:
+            guests_form (dict): The Guests section of the report format.
+
+        Returns:
+            list[CellWrite]: The compiled writes.
+        """
+        writes = [CellWrite(ReportLayout.validate_cell(guests_form["Complimentary_Title"]), None, "Complimentary")]
+        for key, cell in guests_form.items():
+            if key.endswith("_Title"):
+                continue
+            writes.append(CellWrite(ReportLayout.validate_cell(cell), ("Guests", key)))
+        return writes
+
+    @staticmethod
+    def compile_bar_only(bar_only_form: dict) -> list[CellWrite]:
+        """
+        Compiles the Bar_Only section into its headers, titles, counts and costs.
+
+        Args:
+            bar_only_form (dict): The Bar_Only section of the report format.
+
+        Returns:
+            list[CellWrite]: The compiled writes.
+        """
+        headers = ["Session", "Count", "Cost"]
+        header_cells = ["A47", "B47", "C47"]
+
+        writes = [CellWrite(cell, None, header) for header, cell in zip(headers, header_cells)]
+        writes.extend(CellWrite(ReportLayout.validate_cell(bar_only_form[f"{session}_Title"]), None, f"{session} (Bar Only)") for session in SESSIONS)
+        writes.extend(CellWrite(ReportLayout.validate_cell(bar_only_form[f"{session}_Count"]), ("Bar_Only", session, "Count")) for session in SESSIONS)
+        writes.extend(CellWrite(ReportLayout.validate_cell(bar_only_form[f"{session}_Cost"]), ("Bar_Only", session, "Sales")) for session in SESSIONS)
+        return writes
+
+    def get_values(self, data: dict, date: str) -> dict:
+        """
+        Flattens the calculated results of a report into the keys used by the compiled writes.
+
+        Args:
+            data (dict): The results of ReportGenerator.calculations.
+            date (str): The date to be written into the sheet.
+
+        Returns:
+            dict: A dictionary where the keys are the write keys, and the values are the values to be written.
+
+        Raises:
+            UnknownCardTypeException: If a payment type is not defined in the Cards section.
+        """
+        values = {("Date",): date}
+
+        for session, session_data in data["SUB_CATEGORY"].items():
+            for subcategory, cost in session_data.items():
+                values[("Matrix", session, subcategory)] = cost
+
+        # Cash is split out into foreign currencies, while every other payment type is totalled in BBD.
+        foreign_currency = {}
+        for payment_type, payment_data in data["PAYMENT_TYPE"].items():
+            if payment_type == "Cash":
+                for currency, amount in payment_data.items():
+                    if currency != "BBD":
+                        foreign_currency[currency] = foreign_currency.get(currency, 0) + amount
+                continue
+
+            if payment_type not in self.card_types:
+                raise custom_exceptions.UnknownCardTypeException(f"Unknown card type: {payment_type}")
+            values[("Cards", payment_type)] = sum(amount * generic.get_exch_rate(currency) for currency, amount in payment_data.items())
+
+        for currency, amount in foreign_currency.items():
+            values[("Foreign_Currency", currency)] = amount
+
+        for session, count in data["GUESTS"].items():
+            values[("Guests", session)] = count
+        values[("Guests", "Complimentary")] = data["COMPLIMENTARY_COVERS"]
+
+        for session, covers in data["BAR_ONLY"].items():
+            values[("Bar_Only", session, "Count")] = covers["Count"]
+            values[("Bar_Only", session, "Sales")] = covers["Sales"]
+
+        for key, data_key in OTHERS_KEYS.items():
+            values[("Others", key)] = data[data_key]
+
+        return values
+
+    def get_columns(self) -> list[tuple]:
+        """
+        Gets the keys of every report value the layout writes, in the order they are written.
+
+        Returns:
+            list[tuple]: The distinct write keys, starting with ("Date",).
+        """
+        return list(dict.fromkeys(write.key for write in self.writes if write.key is not None and write.value is None))
+
+    def resolve(self, values: dict) -> list[tuple[str, object]]:
+        """
+        Resolves the compiled writes against the values of a report.
+
+        Each section's fixed writes come first, followed by the writes of its values in the order they appear in `values`,
+        so where several keys share a cell, the value that comes last in the calculated results wins.
+        Values that have no cell in the layout, such as a currency or session missing from Report_Format.json, are logged and left out.
+
+        Args:
+            values (dict): The report values, from get_values.
+
+        Returns:
+            list[tuple[str, object]]: A list of (cell, value) pairs, in the order they should be written.
+        """
+        by_section: dict[str, list[tuple]] = {section: [] for section in self.SECTIONS}
+        for key in values:
+            if key in self.key_writes:
+                by_section[key[0]].append(key)
+            elif not (key[0] == "Matrix" and key[-1] in UNLISTED_SUBCATEGORIES):
+                Logger.warning(f"No cell for {' '.join(map(str, key))} in the Report_Format.json. Its value of {values[key]} is not written to the report.")
+
+        cells = []
+        for section in self.SECTIONS:
+            cells.extend((write.cell, write.value) for write in self.fixed_writes[section])
+            for key in by_section[section]:
+                cells.extend((write.cell, write.value if write.value is not None else values[key]) for write in self.key_writes[key])
+        return cells
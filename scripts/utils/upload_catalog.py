@@ -0,0 +1,368 @@
+"""This module is responsible for cataloguing the uploads and generated reports, so they can be looked up without scanning their folders."""
+import json
+import os
+from datetime import datetime
+from typing import Callable
+from .enums import RestaurantNames
+from .logs import Logger
+from .workbook_writer import FileLock
+
+UPLOAD_MODES = ("Sales", "Payments")
+
+class UploadCatalog:
+    """
+    This class maintains a catalog per restaurant in documents/Catalog, which maps each date to its uploads and weekly report.
+
+    Each restaurant's catalog is updated as its files are uploaded or generated, and only that restaurant's file is rewritten.
+    It also records the modification time of the folders it was scanned from. When the catalog does not exist yet, or one of
+    those folders has changed since (such as when a file was copied in or deleted by hand), the restaurant's folders are
+    scanned again, so files added outside of the uploads are found and deleted files are dropped.
+    Dates are stored in the format "YYYYMMDD".
+    """
+
+    def __init__(self, root: str="..") -> None:
+        """
+        Initializes a new instance of the UploadCatalog class.
+
+        Parameters:
+            root (str, optional): The root folder of the project. Defaults to "..".
+
+        Returns:
+            None
+        """
+        self.root: str = root
+        self.catalog_dir: str = f"{root}/documents/Catalog"
+
+    def get_path(self, restaurant_name: str) -> str:
+        """
+        Gets the path of a restaurant's catalog.
+
+        Args:
+            restaurant_name (str): The name of the restaurant.
+
+        Returns:
+            str: The path of the catalog.
+        """
+        return f"{self.catalog_dir}/{restaurant_name.replace(' ', '_')}.json"
+
+    def load(self) -> dict:
+        """
+        Loads the catalog of every restaurant, scanning the restaurants whose catalog is missing or out of date.
+
+        Returns:
+            dict: The catalog, keyed by restaurant name, with the "uploads" and "reports" of each restaurant.
+        """
+        return {restaurant.value[0]: self.load_restaurant(restaurant.value[0]) for restaurant in RestaurantNames}
+
+    def load_restaurant(self, restaurant_name: str) -> dict:
+        """
+        Loads a restaurant's catalog, scanning its folders first if the catalog is missing or out of date.
+
+        Args:
+            restaurant_name (str): The name of the restaurant.
+
+        Returns:
+            dict: The restaurant's "uploads" and "reports".
+        """
+        entry = self.read(restaurant_name)
+        if entry is not None and self.is_current(restaurant_name, entry):
+            return entry
+        return self.update(restaurant_name, lambda entry: None)
+
+    def rebuild(self) -> dict:
+        """
+        Rebuilds the catalog of every restaurant from a scan of the Upload and Generated_Reports folders, and saves it.
+
+        Returns:
+            dict: The rebuilt catalog.
+        """
+        return {restaurant.value[0]: self.update(restaurant.value[0], lambda entry: None, rescan=True) for restaurant in RestaurantNames}
+
+    def read(self, restaurant_name: str) -> dict | None:
+        """
+        Reads a restaurant's saved catalog.
+
+        Args:
+            restaurant_name (str): The name of the restaurant.
+
+        Returns:
+            dict | None: The restaurant's catalog, or None if it does not exist or is unreadable.
+        """
+        path = self.get_path(restaurant_name)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            Logger.warning(f"Rebuilding unreadable catalog in {path}. More details: {e}")
+            return None
+
+    def is_current(self, restaurant_name: str, entry: dict) -> bool:
+        """
+        Checks whether a restaurant's catalog still matches its folders.
+
+        Args:
+            restaurant_name (str): The name of the restaurant.
+            entry (dict): The restaurant's catalog.
+
+        Returns:
+            bool: True if none of the folders the catalog was scanned from have changed since.
+        """
+        return entry.get("folders") == self.get_folder_mtimes(restaurant_name)
+
+    def update(self, restaurant_name: str, change: Callable[[dict], None], rescan: bool=False) -> dict:
+        """
+        Applies a change to a restaurant's catalog, and saves it. The catalog is locked while it changes, so concurrent updates are kept.
+
+        Args:
+            restaurant_name (str): The name of the restaurant.
+            change (Callable[[dict], None]): Modifies the restaurant's catalog in place.
+            rescan (bool, optional): Whether to scan the folders again even if the saved catalog is up to date. Defaults to False.
+
+        Returns:
+            dict: The updated catalog of the restaurant.
+        """
+        path = self.get_path(restaurant_name)
+        os.makedirs(self.catalog_dir, exist_ok=True)
+
+        with FileLock(path):
+            entry = None if rescan else self.read(restaurant_name)
+            if entry is None or not self.is_current(restaurant_name, entry):
+                entry = self.scan_restaurant(restaurant_name)
+
+            change(entry)
+
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            try:
+                with open(temp_path, "w") as f:
+                    json.dump(entry, f, indent=1, sort_keys=True)
+                os.replace(temp_path, path)
+            except Exception as e:
+                Logger.warning(f"Unable to update the catalog in {path}. More details: {e}")
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+
+        return entry
+
+    def get_folders(self, restaurant_name: str) -> tuple[str | None, str | None]:
+        """
+        Gets a restaurant's upload and report folders.
+
+        Args:
+            restaurant_name (str): The name of the restaurant.
+
+        Returns:
+            tuple[str | None, str | None]: The upload folder and the report folder, or None for a folder that does not exist.
+        """
+        return (UploadCatalog.find_folder(f"{self.root}/documents/Upload", restaurant_name),
+                UploadCatalog.find_folder(f"{self.root}/documents/Generated_Reports", restaurant_name))
+
+    def get_folder_mtimes(self, restaurant_name: str) -> dict[str, int]:
+        """
+        Gets the modification time of every folder a restaurant's catalog is scanned from.
+        Adding, removing or renaming a file changes the modification time of its folder.
+
+        Args:
+            restaurant_name (str): The name of the restaurant.
+
+        Returns:
+            dict[str, int]: The modification time of each folder in nanoseconds, keyed by its path.
+        """
+        upload_dir, report_dir = self.get_folders(restaurant_name)
+
+        mtimes = {}
+        if upload_dir:
+            mtimes[upload_dir] = os.stat(upload_dir).st_mtime_ns
+        if report_dir:
+            mtimes[report_dir] = os.stat(report_dir).st_mtime_ns
+            for year in os.scandir(report_dir):
+                if year.is_dir():
+                    mtimes[year.path.replace("\\", "/")] = year.stat().st_mtime_ns
+        return mtimes
+
+    def scan(self) -> dict:
+        """
+        Scans the Upload and Generated_Reports folders for every restaurant's files.
+
+        Returns:
+            dict: The catalog of the files found, keyed by restaurant name.
+        """
+        return {restaurant.value[0]: self.scan_restaurant(restaurant.value[0]) for restaurant in RestaurantNames}
+
+    def scan_restaurant(self, restaurant_name: str) -> dict:
+        """
+        Scans a restaurant's Upload and Generated_Reports folders for its files.
+        Files that are not named like an upload or a report of the restaurant are skipped.
+
+        Args:
+            restaurant_name (str): The name of the restaurant.
+
+        Returns:
+            dict: The restaurant's catalog of the files found.
+        """
+        Logger.log(f"Scanning the uploads and reports of {restaurant_name} for the catalog")
+        abrv = RestaurantNames.get_restaurant_by_name(restaurant_name).value[1]
+
+        # The folders are read before they are scanned, so a file added during the scan makes the catalog out of date.
+        entry = {"uploads": {}, "reports": {}, "folders": self.get_folder_mtimes(restaurant_name)}
+        upload_dir, report_dir = self.get_folders(restaurant_name)
+
+        if upload_dir:
+            for file in os.scandir(upload_dir):
+                if not file.is_file():
+                    continue
+                upload = UploadCatalog.parse_upload_name(file.name)
+                if upload is None or upload[0] != abrv:
+                    continue
+                _, filemode, date = upload
+                entry["uploads"].setdefault(date, {})[filemode] = {"path": file.path.replace("\\", "/"), "size": file.stat().st_size}
+
+        if report_dir:
+            for year in os.scandir(report_dir):
+                if not year.is_dir():
+                    continue
+                for file in os.scandir(year.path):
+                    if file.is_file() and file.name.startswith(f"{abrv}_") and file.name.endswith("_Report.xlsx"):
+                        UploadCatalog.add_report_entry(entry, file.path.replace("\\", "/"), file.stat().st_size)
+
+        return entry
+
+    @staticmethod
+    def parse_upload_name(filename: str) -> tuple[str, str, str] | None:
+        """
+        Parses the name of an uploaded CSV.
+
+        Args:
+            filename (str): The name of the file, in the format "<ABRV>-<Sales|Payments>-<YYYYMMDD>.csv".
+
+        Returns:
+            tuple[str, str, str] | None: The abbreviation, mode and date of the upload, or None if the name is not an upload's.
+        """
+        if not filename.endswith(".csv"):
+            return None
+
+        parts = filename[:-len(".csv")].split("-")
+        if len(parts) != 3 or parts[1] not in UPLOAD_MODES:
+            return None
+
+        try:
+            datetime.strptime(parts[2], "%Y%m%d")
+        except ValueError:
+            return None
+        # strptime also accepts dates without their leading zeros, which would be catalogued under a different key.
+        if len(parts[2]) != 8:
+            return None
+
+        return parts[0], parts[1], parts[2]
+
+    @staticmethod
+    def find_folder(parent: str, restaurant_name: str) -> str | None:
+        """
+        Finds a restaurant's folder, ignoring the case of its name.
+
+        Args:
+            parent (str): The folder containing a folder per restaurant.
+            restaurant_name (str): The name of the restaurant.
+
+        Returns:
+            str | None: The path to the restaurant's folder, or None if it does not exist.
+        """
+        if not os.path.isdir(parent):
+            return None
+
+        folder_name = restaurant_name.replace(" ", "_").lower()
+        for folder in os.scandir(parent):
+            if folder.is_dir() and folder.name.lower() == folder_name:
+                return folder.path.replace("\\", "/")
+        return None
+
+    @staticmethod
+    def add_report_entry(entry: dict, path: str, size: int) -> None:
+        """
+        Adds a weekly report to a restaurant's catalog entry, keyed by the first day of its week.
+
+        Args:
+            entry (dict): The restaurant's catalog entry.
+            path (str): The path to the report, in the format ".../<year>/<ABRV>_<dd>_<Mon>_to_<dd>_<Mon>_Report.xlsx".
+            size (int): The size of the report.
+
+        Returns:
+            None
+        """
+        year = os.path.basename(os.path.dirname(path))
+        parts = os.path.basename(path).split("_")
+        try:
+            start_day = datetime.strptime(f"{parts[1]}_{parts[2]}_{year}", "%d_%b_%Y")
+        except (IndexError, ValueError):
+            return None
+
+        # The year folder is the year of the upload, so a week that started in December may be stored in the next year.
+        if start_day.month == 12 and start_day.weekday() != 0:
+            start_day = start_day.replace(year=start_day.year - 1)
+        entry["reports"][start_day.strftime("%Y%m%d")] = {"path": path, "size": size}
+        return None
+
+    def add_upload(self, restaurant_name: str, date: datetime, filemode: str, path: str) -> None:
+        """
+        Records an uploaded Sales or Payments file.
+
+        Args:
+            restaurant_name (str): The name of the restaurant.
+            date (datetime): The date of the upload.
+            filemode (str): Either "Sales" or "Payments".
+            path (str): The path the upload was stored at.
+
+        Returns:
+            None
+        """
+        def change(entry: dict) -> None:
+            entry["uploads"].setdefault(date.strftime("%Y%m%d"), {})[filemode] = {"path": path, "size": os.path.getsize(path)}
+
+        self.update(restaurant_name, change)
+        return None
+
+    def add_report(self, restaurant_name: str, path: str) -> None:
+        """
+        Records a generated weekly report.
+
+        Args:
+            restaurant_name (str): The name of the restaurant.
+            path (str): The path to the report.
+
+        Returns:
+            None
+        """
+        self.update(restaurant_name, lambda entry: UploadCatalog.add_report_entry(entry, path, os.path.getsize(path)))
+        return None
+
+    def get_upload_dates(self, restaurant_name: str, catalog: dict | None=None) -> list[datetime]:
+        """
+        Gets the dates of a restaurant that have both a Sales and a Payments upload.
+
+        Args:
+            restaurant_name (str): The name of the restaurant.
+            catalog (dict, optional): An already loaded catalog of every restaurant. Defaults to loading the restaurant's catalog.
+
+        Returns:
+            list[datetime]: The dates, in order.
+        """
+        entry = self.load_restaurant(restaurant_name) if catalog is None else catalog.get(restaurant_name, {})
+        uploads = entry.get("uploads", {})
+        return [datetime.strptime(date, "%Y%m%d") for date, files in sorted(uploads.items()) if all(mode in files for mode in UPLOAD_MODES)]
+
+    def get_report_weeks(self, restaurant_name: str, catalog: dict | None=None) -> list[datetime]:
+        """
+        Gets the first day of each week a restaurant has a report for.
+
+        Args:
+            restaurant_name (str): The name of the restaurant.
+            catalog (dict, optional): An already loaded catalog of every restaurant. Defaults to loading the restaurant's catalog.
+
+        Returns:
+            list[datetime]: The first days of the weeks, in order.
+        """
+        entry = self.load_restaurant(restaurant_name) if catalog is None else catalog.get(restaurant_name, {})
+        reports = entry.get("reports", {})
+        return [datetime.strptime(date, "%Y%m%d") for date in sorted(reports)]
@@ -0,0 +1,191 @@
+"""This module is responsible for recording which uploads have been processed, so unchanged days are not generated again."""
+import json
+import os
+from hashlib import sha256
+from .logs import Logger
+from .workbook_writer import FileLock
+
+class UploadManifest:
+    """
+    This class keeps a manifest per restaurant of the days that have been generated.
+
+    Each day records the size, modification time and content hash of every input it was generated from (the Sales and
+    Payments uploads, the report template and the report format), the cleaning and calculation versions, and the workbook it was
+    written to. A day is current while all of those still match, so only new or changed days need to be generated.
+    """
+
+    def __init__(self, root: str="..", version: str="1.1") -> None:
+        """
+        Initializes a new instance of the UploadManifest class.
+
+        Parameters:
+            root (str, optional): The root folder of the project. Defaults to "..".
+            version (str, optional): The version of the cleaning and the calculations, in the format "<cleaner>.<metrics>".
+                Changing either makes every recorded day stale. Defaults to "1.1".
+
+        Returns:
+            None
+        """
+        self.manifest_dir: str = f"{root}/documents/Manifests"
+        self.version: str = version
+
+    def get_path(self, restaurant_name: str) -> str:
+        """
+        Gets the path of a restaurant's manifest.
+
+        Args:
+            restaurant_name (str): The name of the restaurant.
+
+        Returns:
+            str: The path of the manifest.
+        """
+        return f"{self.manifest_dir}/{restaurant_name.replace(' ', '_')}.json"
+
+    def load(self, restaurant_name: str) -> dict:
+        """
+        Loads a restaurant's manifest.
+
+        Args:
+            restaurant_name (str): The name of the restaurant.
+
+        Returns:
+            dict: The recorded days, keyed by date in the format "YYYYMMDD". Empty if the manifest does not exist or is unreadable.
+        """
+        path = self.get_path(restaurant_name)
+        if not os.path.exists(path):
+            return {}
+
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            Logger.warning(f"Discarding unreadable manifest in {path}. More details: {e}")
+            return {}
+
+    def record(self, restaurant_name: str, entries: dict[str, dict]) -> None:
+        """
+        Records generated days in a restaurant's manifest, keeping the days recorded by other runs.
+
+        Args:
+            restaurant_name (str): The name of the restaurant.
+            entries (dict[str, dict]): The entries from create_entry, keyed by date in the format "YYYYMMDD".
+
+        Returns:
+            None
+        """
+        if not entries:
+            return None
+
+        path = self.get_path(restaurant_name)
+        os.makedirs(self.manifest_dir, exist_ok=True)
+
+        # Other processes may be recording days of the same restaurant, so the manifest is merged while it is locked.
+        with FileLock(path):
+            manifest = self.load(restaurant_name)
+            manifest.update(entries)
+
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            try:
+                with open(temp_path, "w") as f:
+                    json.dump(manifest, f, indent=1, sort_keys=True)
+                os.replace(temp_path, path)
+            except Exception as e:
+                Logger.warning(f"Unable to update the manifest in {path}. More details: {e}")
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+        return None
+
+    def create_entry(self, fingerprints: dict[str, dict], output: str) -> dict:
+        """
+        Creates the manifest entry of a generated day.
+
+        Args:
+            fingerprints (dict[str, dict]): The fingerprints of the inputs the day was generated from, from fingerprint_inputs.
+                They should be taken before the inputs are read, so an input that changes while the day is generated is not
+                recorded as generated.
+            output (str): The path to the workbook the day was written to.
+
+        Returns:
+            dict: The manifest entry.
+        """
+        return {
+            "version": self.version,
+            "inputs": fingerprints,
+            "output": output,
+        }
+
+    @staticmethod
+    def fingerprint_inputs(inputs: dict[str, str]) -> dict[str, dict]:
+        """
+        Gets the fingerprints of the inputs of a day. Inputs that do not exist are left out, so the day is never current.
+
+        Args:
+            inputs (dict[str, str]): The path of each input the day is generated from, keyed by the kind of input.
+
+        Returns:
+            dict[str, dict]: The fingerprint of each input, keyed by the kind of input.
+        """
+        return {name: UploadManifest.fingerprint(path) for name, path in inputs.items() if os.path.exists(path)}
+
+    def is_current(self, entry: dict | None, inputs: dict[str, str], output: str) -> bool:
+        """
+        Checks whether a recorded day is still up to date.
+
+        Args:
+            entry (dict | None): The day's manifest entry, if it has one.
+            inputs (dict[str, str]): The path of each input the day is generated from, keyed by the kind of input.
+            output (str): The path to the workbook the day is written to.
+
+        Returns:
+            bool: True if the day was generated with the current version, from the same inputs, into a workbook that still exists.
+        """
+        if not entry or entry.get("version") != self.version or entry.get("output") != output or not os.path.exists(output):
+            return False
+
+        recorded = entry.get("inputs", {})
+        if recorded.keys() != inputs.keys():
+            return False
+
+        for name, path in inputs.items():
+            if not os.path.exists(path):
+                return False
+
+            # Files that have not been touched are not hashed again.
+            stat = os.stat(path)
+            if recorded[name].get("size") == stat.st_size and recorded[name].get("mtime") == stat.st_mtime_ns:
+                continue
+            if UploadManifest.hash_file(path) != recorded[name].get("sha256"):
+                return False
+
+        return True
+
+    @staticmethod
+    def fingerprint(path: str) -> dict:
+        """
+        Gets the size, modification time and content hash of a file.
+
+        Args:
+            path (str): The path to the file.
+
+        Returns:
+            dict: The fingerprint of the file.
+        """
+        stat = os.stat(path)
+        return {"size": stat.st_size, "mtime": stat.st_mtime_ns, "sha256": UploadManifest.hash_file(path)}
+
+    @staticmethod
+    def hash_file(path: str) -> str:
+        """
+        Hashes the contents of a file.
+
+        Args:
+            path (str): The path to the file.
+
+        Returns:
+            str: The hex digest of the file's contents.
+        """
+        digest = sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
@@ -0,0 +1,190 @@
+"""This module is responsible for coordinating writes to shared workbooks, so concurrent updates to the same workbook are never lost."""
+import os
+from hashlib import sha1
+from os.path import abspath, dirname, exists
+from tempfile import gettempdir
+from threading import Event, Lock
+from typing import Callable
+from .excel_controller import ExcelController
+from .logs import Logger
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+class FileLock:
+    """
+    This class holds an exclusive lock on a file across processes, through a lock file.
+
+    The lock files are kept together in a single folder of the system's temporary folder, named after the path of the file
+    they lock, so they never show up next to the workbooks. They are left in place after use, since removing a lock file
+    while another process waits on it would let a third process lock a new file of the same name at the same time.
+    """
+
+    lock_dir: str = f"{gettempdir()}/restaurant_report_locks"
+
+    def __init__(self, file_path: str) -> None:
+        """
+        Initializes a new instance of the FileLock class.
+
+        Parameters:
+            file_path (str): The path to the file to lock.
+
+        Returns:
+            None
+        """
+        self.lock_path: str = f"{FileLock.lock_dir}/{sha1(abspath(file_path).encode()).hexdigest()}.lock"
+        self.handle = None
+
+    def __enter__(self) -> "FileLock":
+        os.makedirs(dirname(self.lock_path), exist_ok=True)
+        self.handle = open(self.lock_path, "a+b")
+
+        if fcntl is not None:
+            fcntl.flock(self.handle.fileno(), fcntl.LOCK_EX)
+            return self
+
+        # LK_LOCK only retries for about 10 seconds before giving up, so keep waiting until the lock is free.
+        self.handle.seek(0)
+        while True:
+            try:
+                msvcrt.locking(self.handle.fileno(), msvcrt.LK_LOCK, 1)
+                return self
+            except OSError:
+                continue
+
+    def __exit__(self, *args) -> None:
+        try:
+            if fcntl is not None:
+                fcntl.flock(self.handle.fileno(), fcntl.LOCK_UN)
+            else:
+                self.handle.seek(0)
+                msvcrt.locking(self.handle.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self.handle.close()
+            self.handle = None
+
+class PendingUpdate:
+    """A queued update to a workbook, along with its outcome once it has been applied."""
+
+    def __init__(self, update: Callable[[ExcelController], int]) -> None:
+        self.update: Callable[[ExcelController], int] = update
+        self.result: int = 0
+        self.error: Exception | None = None
+        self.done: Event = Event()
+
+class WorkbookWriter:
+    """
+    This class coordinates the read-modify-write cycles of shared workbooks, such as the weekly reports and comp summaries.
+
+    Updates to the same workbook are queued. Whichever caller gets to the workbook first opens it once, applies every queued
+    update, and saves it once, so updates that arrive together are merged instead of overwriting each other.
+    The workbook is also locked across processes while it is being updated, and saved through a temporary file that
+    atomically replaces it, so a reader never sees a partially written workbook.
+    """
+
+    queues: dict[str, list[PendingUpdate]] = {}
+    # The lock of each workbook, along with the number of callers using it. The lock is dropped once nobody uses it.
+    locks: dict[str, tuple[Lock, int]] = {}
+    registry_lock: Lock = Lock()
+
+    @staticmethod
+    def update(file_path: str, open_workbook: Callable[[], ExcelController], update: Callable[[ExcelController], int]) -> int:
+        """
+        Applies an update to a workbook, and saves it if anything changed.
+
+        Args:
+            file_path (str): The path to the workbook.
+            open_workbook (Callable[[], ExcelController]): Opens the workbook, or creates it if it does not exist yet.
+            update (Callable[[ExcelController], int]): Writes into the workbook, and returns the number of cells it changed.
+                It may be applied more than once, to a freshly opened workbook each time.
+
+        Returns:
+            int: The number of cells the update changed.
+
+        Raises:
+            Exception: Any exception raised by the update, or while opening or saving the workbook.
+        """
+        key = abspath(file_path)
+        pending = PendingUpdate(update)
+
+        with WorkbookWriter.registry_lock:
+            WorkbookWriter.queues.setdefault(key, []).append(pending)
+            lock, users = WorkbookWriter.locks.get(key, (Lock(), 0))
+            WorkbookWriter.locks[key] = (lock, users + 1)
+
+        try:
+            with lock:
+                # Another caller may have already applied this update along with its own.
+                if not pending.done.is_set():
+                    with WorkbookWriter.registry_lock:
+                        batch = WorkbookWriter.queues.pop(key, [])
+                    WorkbookWriter.apply(file_path, open_workbook, batch)
+        finally:
+            # Callers queue their update before taking the lock, and whoever drains the queue holds the lock. Every caller is
+            # counted as a user before it queues, and its update has been drained by the time it gets here, so once the last
+            # user leaves, the queue is empty and the lock can be dropped.
+            with WorkbookWriter.registry_lock:
+                lock, users = WorkbookWriter.locks[key]
+                if users == 1:
+                    del WorkbookWriter.locks[key]
+                else:
+                    WorkbookWriter.locks[key] = (lock, users - 1)
+
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    @staticmethod
+    def apply(file_path: str, open_workbook: Callable[[], ExcelController], batch: list[PendingUpdate]) -> None:
+        """
+        Opens a workbook once, applies a batch of queued updates to it, and saves it once.
+
+        An update that fails may have already written some of its cells. When one does, the workbook is opened again and only
+        the updates that succeeded are applied, so nothing of the failed update is saved along with them.
+
+        Args:
+            file_path (str): The path to the workbook.
+            open_workbook (Callable[[], ExcelController]): Opens the workbook, or creates it if it does not exist yet.
+            batch (list[PendingUpdate]): The queued updates.
+
+        Returns:
+            None
+        """
+        try:
+            with FileLock(file_path):
+                # The workbook is only opened once it is locked, so it includes every update saved before.
+                is_new = not exists(file_path)
+
+                applied = batch
+                while applied:
+                    controller = open_workbook()
+
+                    changed = 0
+                    failed = False
+                    for pending in applied:
+                        try:
+                            pending.result = pending.update(controller)
+                            changed += pending.result
+                        except Exception as e:
+                            pending.error = e
+                            failed = True
+
+                    if not failed:
+                        break
+                    applied = [pending for pending in applied if pending.error is None]
+
+                if applied and (changed or is_new):
+                    os.makedirs(dirname(abspath(file_path)), exist_ok=True)
+                    controller.save(file_path)
+                    Logger.log(f"Saved {len(applied)} update(s) to {file_path}")
+                elif applied:
+                    Logger.log(f"Workbook {file_path} is already up to date")
+        except Exception as e:
+            for pending in batch:
+                pending.error = pending.error or e
+        finally:
+            for pending in batch:
+                pending.done.set()
@@ -1,34 +1,369 @@
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from datetime import datetime
-from fastapi import FastAPI, File, Form, Request, UploadFile
-from fastapi.responses import FileResponse, HTMLResponse
+from email.utils import formatdate, parsedate_to_datetime
+from hashlib import sha1
+from html import escape
+from threading import Lock, get_ident
+from urllib.parse import quote, urlencode
+from uuid import uuid4
+import multiprocessing
+from fastapi import FastAPI, File, Form, HTTPException, Request, Response, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, RedirectResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
 
 from daily_gen import GeneratorController
-from os.path import exists, isdir
-from os import mkdir, listdir
+from scripts.utils import CustomExceptions, Logger, RestaurantNames, generic
+from os.path import basename, dirname, exists, isfile, lexists, relpath
+from os import getpid, link, mkdir, remove, replace, scandir, stat, symlink
+from shutil import copyfile
 
-app = FastAPI()
+# Either "processes" or "threads". Reports are generated in the background, so requests are answered while they run.
+job_mode = "processes"
+
+# The number of reports generated at once, one per restaurant.
+max_workers = 4
+
+# The number of finished jobs whose status is kept.
+job_history = 200
+
+# The number of files listed per page of /getFiles.
+files_per_page = 25
+
+# The number of bytes read at a time when part of a report is downloaded.
+download_chunk_size = 1024 * 1024
+
+executor: ProcessPoolExecutor | ThreadPoolExecutor | None = None
+jobs: OrderedDict[str, dict] = OrderedDict()
+jobs_lock = Lock()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global executor
+    if job_mode == "processes":
+        # Forking would copy the server's locks and threads into the workers, so they are started fresh instead.
+        executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+    else:
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+    yield
+    executor.shutdown(wait=True, cancel_futures=True)
+
+app = FastAPI(lifespan=lifespan)
 
 templates = Jinja2Templates(directory="./templates")
 
-app.mount("/static", StaticFiles(directory="./static"), name="static")
+# Generated workbooks are linked into ./static, so the links are followed out of it.
+app.mount("/static", StaticFiles(directory="./static", follow_symlink=True), name="static")
+
+class FileIndex:
+    """
+    This class caches the listing of the generated reports in ./static, newest first.
+
+    Each restaurant folder's listing is kept until the folder's modification time changes, which happens whenever a
+    report is linked into it, so a listing only stats the folders instead of every file in them. The merged listing of
+    every folder is also kept until any of them changes.
+    """
+
+    def __init__(self, root: str="./static") -> None:
+        self.root: str = root
+        self.folders: dict[str, tuple[int, list[dict]]] = {}
+        self.listing: tuple[dict[str, int], list[dict]] | None = None
+        self.lock: Lock = Lock()
+
+    def get_version(self) -> tuple[int, dict[str, int]]:
+        """
+        Gets the modification time of the ./static folder and of each restaurant folder in it.
+
+        Returns:
+            tuple[int, dict[str, int]]: The latest modification time in nanoseconds, and the modification time of each folder.
+        """
+        mtimes = {folder.name: folder.stat().st_mtime_ns for folder in scandir(self.root) if folder.is_dir()}
+        return max([stat(self.root).st_mtime_ns, *mtimes.values()]), mtimes
+
+    def get_files(self, mtimes: dict[str, int]) -> list[dict]:
+        """
+        Gets every listed report, reading again only the folders that changed since they were last read.
+
+        Args:
+            mtimes (dict[str, int]): The modification time of each folder, from get_version.
+
+        Returns:
+            list[dict]: The folder, name, link and modification time of each report, newest first. The list is shared, so it should not be modified.
+        """
+        with self.lock:
+            if self.listing is not None and self.listing[0] == mtimes:
+                return self.listing[1]
+
+            for folder in list(self.folders):
+                if folder not in mtimes:
+                    del self.folders[folder]
+
+            for folder, mtime in mtimes.items():
+                if folder in self.folders and self.folders[folder][0] == mtime:
+                    continue
+
+                files = [
+                    {"folder": folder, "name": file.name, "url": f"./static/{quote(folder)}/{quote(file.name)}", "mtime": file.stat().st_mtime}
+                    for file in scandir(f"{self.root}/{folder}") if file.is_file() and not file.name.startswith(".")
+                ]
+                self.folders[folder] = (mtime, files)
+
+            files = sorted((file for _, folder_files in self.folders.values() for file in folder_files), key=lambda file: file["mtime"], reverse=True)
+            self.listing = (mtimes, files)
+        return files
+
+file_index = FileIndex()
+
+def save_uploads(location: str, date_obj: datetime, sales: UploadFile, payments: UploadFile) -> None:
+    """
+    Stores the uploaded Sales and Payments files. They are stored before the request ends, since the uploads are closed with it.
+
+    Args:
+        location (str): The key of the restaurant.
+        date_obj (datetime): The date of the uploads.
+        sales (UploadFile): The uploaded Sales file.
+        payments (UploadFile): The uploaded Payments file.
+
+    Returns:
+        None
+    """
+    controller = GeneratorController()
+    controller.set_generator(location, date_obj.strftime("%m/%d/%Y"))
+    controller.upload_file(sales.file, "Sales")
+    controller.upload_file(payments.file, "Payments")
+
+def run_generation(location: str, date_str: str) -> str:
+    """
+    Generates a daily report from its stored uploads, and links the workbook into ./static. Runs in a worker.
+
+    Args:
+        location (str): The key of the restaurant.
+        date_str (str): The date of the report, in the format "MM/DD/YYYY".
+
+    Returns:
+        str: The path to the generated workbook.
+    """
+    controller = GeneratorController()
+    controller.set_generator(location, date_str)
+    result_file_path = controller.generate_report()
+
+    Logger.log("Report generated and stored in " + result_file_path)
+
+    restaurant_name = controller.generator.restaurant_name.upper()
+
+    if not exists(f"./static/{restaurant_name}"):
+        mkdir("./static/" + restaurant_name)
+
+    static_filepath = f"./static/{restaurant_name}/" + result_file_path.split('/')[-1]
+    link_report(result_file_path, static_filepath)
+    Logger.log("Report linked to " + static_filepath)
+    return result_file_path
+
+def link_report(report_path: str, static_filepath: str) -> None:
+    """
+    Makes a generated workbook available under ./static without copying it.
+
+    A symbolic link is used where possible, since it always points to the latest save of the workbook. Otherwise a hard
+    link is used, and the workbook is only copied when neither is supported. The link is swapped in whole, so a
+    download never sees a missing or partial file.
+
+    Each save replaces the workbook with a new file, so a hard link or copy keeps the save it was made from. It is made
+    again after every generation from the server, but saves made outside of it (such as by run_all_daily_reports.py)
+    are only listed once the week is generated from the server again. /reports always serves the latest save.
+
+    Args:
+        report_path (str): The path to the generated workbook.
+        static_filepath (str): The path to make it available at.
+
+    Returns:
+        None
+    """
+    temp_filepath = f"{dirname(static_filepath)}/.{basename(static_filepath)}.{getpid()}.{get_ident()}.tmp"
+    try:
+        try:
+            symlink(relpath(report_path, dirname(static_filepath)), temp_filepath)
+        except OSError:
+            try:
+                link(report_path, temp_filepath)
+            except OSError:
+                copyfile(report_path, temp_filepath)
+        replace(temp_filepath, static_filepath)
+    finally:
+        if lexists(temp_filepath):
+            remove(temp_filepath)
+
+def get_download_url(location: str, report_path: str) -> str:
+    """
+    Gets the link to download a generated workbook from /reports.
+
+    Args:
+        location (str): The key of the restaurant.
+        report_path (str): The path to the generated workbook.
+
+    Returns:
+        str: The download link.
+    """
+    return f"/reports/{location}/{basename(dirname(report_path))}/{quote(basename(report_path))}"
+
+def get_byte_range(range_header: str | None, size: int) -> tuple[int, int] | None:
+    """
+    Parses the Range header of a download, so an interrupted download can be resumed.
+
+    Only a single range of bytes is supported. Any other range is ignored, and the whole file is sent instead.
+
+    Args:
+        range_header (str | None): The value of the Range header, e.g. "bytes=100-199", "bytes=100-" or "bytes=-100".
+        size (int): The size of the file.
+
+    Returns:
+        tuple[int, int] | None: The first and last byte of the range, or None if the whole file should be sent.
+
+    Raises:
+        HTTPException: If the range starts after the end of the file.
+    """
+    if not range_header or not range_header.startswith("bytes=") or "," in range_header:
+        return None
+
+    start, _, end = range_header[len("bytes="):].strip().partition("-")
+    try:
+        if not start:
+            # A suffix range, for the last bytes of the file.
+            start, end = max(size - int(end), 0), size - 1
+        else:
+            start, end = int(start), min(int(end), size - 1) if end else size - 1
+    except ValueError:
+        return None
+
+    if start > end or start >= size:
+        raise HTTPException(status_code=416, detail="The requested range is not satisfiable", headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+def read_byte_range(path: str, start: int, end: int):
+    """
+    Reads a range of bytes of a file in chunks.
+
+    Args:
+        path (str): The path to the file.
+        start (int): The first byte to read.
+        end (int): The last byte to read.
+
+    Yields:
+        bytes: The next chunk of the range.
+    """
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(download_chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+def submit_job(location: str, date_obj: datetime) -> str:
+    """
+    Queues the generation of a daily report on the worker pool.
+
+    Args:
+        location (str): The key of the restaurant.
+        date_obj (datetime): The date of the report.
+
+    Returns:
+        str: The ID of the job.
+    """
+    job_id = uuid4().hex
+    future = executor.submit(run_generation, location, date_obj.strftime("%m/%d/%Y"))
+
+    with jobs_lock:
+        jobs[job_id] = {"location": location, "date": date_obj.strftime("%m/%d/%Y"), "created": datetime.now().isoformat(timespec="seconds"), "future": future}
+
+        # Forget the oldest finished jobs, so the registry does not grow forever.
+        finished = [key for key, job in jobs.items() if job["future"].done()]
+        for key in finished[:max(0, len(jobs) - job_history)]:
+            del jobs[key]
+    return job_id
+
+def get_job(job_id: str) -> dict:
+    """
+    Gets a job and its current status.
+
+    Args:
+        job_id (str): The ID of the job.
+
+    Returns:
+        dict: The job's status, with its download link when it is done, or its error when it failed.
+
+    Raises:
+        HTTPException: If there is no job with the ID.
+    """
+    with jobs_lock:
+        job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"No job found with the ID {job_id}")
+
+    future: Future = job["future"]
+    status = {"id": job_id, "location": job["location"], "date": job["date"], "created": job["created"]}
+
+    if not future.done():
+        status["status"] = "running" if future.running() else "queued"
+    elif future.cancelled():
+        status["status"] = "failed"
+        status["error"] = "The job was cancelled"
+    elif future.exception() is not None:
+        status["status"] = "failed"
+        status["error"] = str(future.exception())
+    else:
+        status["status"] = "done"
+        status["download"] = get_download_url(job["location"], future.result())
+    return status
 
 @app.get("/")
 async def index(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
 @app.get("/getFiles")
-async def getFiles():
-    folders = [file for file in listdir("./static") if isdir(f"./static/{file}")]
+async def getFiles(request: Request, restaurant: str | None = None, date: str | None = None, page: int = 1):
+    version, mtimes = file_index.get_version()
 
-    folder_html = ""
+    # The listing only changes when a report is written, so browsers polling it revalidate with the ETag instead.
+    etag = '"' + sha1(f"{version}:{restaurant}:{date}:{page}".encode()).hexdigest() + '"'
+    last_modified = formatdate(version / 1e9, usegmt=True)
+    headers = {"ETag": etag, "Last-Modified": last_modified, "Cache-Control": "no-cache"}
 
-    for folder in folders:
-        for file in listdir(f"./static/{folder}"):
-            folder_html += f"<li><a href='./static/{folder}/{file}'>{file}</a></li>"
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    if "if-none-match" not in request.headers and "if-modified-since" in request.headers:
+        try:
+            if int(version / 1e9) <= parsedate_to_datetime(request.headers["if-modified-since"]).timestamp():
+                return Response(status_code=304, headers=headers)
+        except (TypeError, ValueError):
+            pass
 
-    return HTMLResponse(folder_html)
+    files = file_index.get_files(mtimes)
+
+    try:
+        if restaurant:
+            folder = RestaurantNames.get_restaurant_by_key(restaurant.upper()).value[0].upper()
+            files = [file for file in files if file["folder"] == folder]
+        if date:
+            # Reports are named after their week, so keep the reports that a generation for the date is written to.
+            week_name = basename(generic.get_report_filename(datetime.strptime(date, "%Y-%m-%d"), "", "", ".")).split("_", 1)[-1]
+            files = [file for file in files if file["name"].split("_", 1)[-1] == week_name]
+    except (CustomExceptions.InvalidRestaurantNameException, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    page = max(page, 1)
+    start = (page - 1) * files_per_page
+    folder_html = "".join(f"<li><a href='{file['url']}'>{escape(file['name'])}</a></li>" for file in files[start:start + files_per_page])
+
+    if start + files_per_page < len(files):
+        query = urlencode({key: value for key, value in {"restaurant": restaurant, "date": date, "page": page + 1}.items() if value})
+        folder_html += f"<li hx-get='/getFiles?{query}' hx-trigger='click' hx-swap='outerHTML'><a>More...</a></li>"
+
+    return HTMLResponse(folder_html, headers=headers)
 
 
 @app.post("/generate")
@@ -37,37 +372,77 @@ async def generate(
     sales: UploadFile = File(...),
     payments: UploadFile = File(...),
 ):
-    file_date = sales.filename.split("-")[-1].split(".")[0]
-    date_obj = datetime.strptime(file_date, "%Y%m%d")
-    
+    if sales.filename is None:
+        raise HTTPException(status_code=400, detail="The Sales file has no name")
+
     try:
-        controller = GeneratorController()
-        controller.set_generator(location, date_obj.strftime("%m/%d/%Y"))
-        controller.upload_file(sales.file, "Sales")
-        controller.upload_file(payments.file, "Payments")
-        result_file_path = controller.generate_report()
-
-        print("Report generated and stored in " + result_file_path)
-    except KeyError as e:
-        print("KeyError", e)
-        return {"error": e}
+        file_date = sales.filename.split("-")[-1].split(".")[0]
+        date_obj = datetime.strptime(file_date, "%Y%m%d")
+    except ValueError as e:
+        # The Sales file is not named "<ABRV>-Sales-<YYYYMMDD>.csv".
+        Logger.warning(f"Rejected the upload {sales.filename}: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        await run_in_threadpool(save_uploads, location, date_obj, sales, payments)
+        job_id = submit_job(location, date_obj)
+    except CustomExceptions.InvalidRestaurantNameException as e:
+        Logger.warning(f"Rejected the upload {sales.filename}: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        print(e)
-        return {"error": e}
-    
-    restaurant_name = controller.generator.restaurant_name.upper()
+        Logger.error(f"Failed to store the uploads for {location}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
-    if not exists(f"./static/{restaurant_name}"):
-        mkdir("./static/" + restaurant_name)
+    return JSONResponse({"message": "Files uploaded Successfully, generating the report", "job": job_id, "status": f"/jobs/{job_id}"}, status_code=202)
 
-    static_filepath = f"./static/{restaurant_name}/" + result_file_path.split('/')[-1]
-    with open(result_file_path, "rb") as f:
-        with open(static_filepath, "wb") as f2:
-            f2.write(f.read())
-    print(static_filepath)
-    return {"message": "Files uploaded Successfully", "file": FileResponse(path=static_filepath, filename=result_file_path.split('/')[-1])}
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    return get_job(job_id)
+
+@app.get("/jobs/{job_id}/result")
+async def job_result(job_id: str):
+    status = get_job(job_id)
+
+    if status["status"] == "failed":
+        return JSONResponse(status, status_code=500)
+    if status["status"] != "done":
+        return JSONResponse(status, status_code=202)
+
+    # The workbook is served by /reports, so its path on disk is never exposed.
+    return RedirectResponse(status["download"], status_code=303)
+
+@app.get("/reports/{location}/{year}/{filename}")
+async def download_report(request: Request, location: str, year: str, filename: str):
+    try:
+        restaurant_name = RestaurantNames.get_restaurant_by_key(location.upper()).value[0]
+    except CustomExceptions.InvalidRestaurantNameException as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    report_path = f"./documents/Generated_Reports/{restaurant_name.replace(' ', '_')}/{year}/{filename}"
+    if not year.isdigit() or basename(filename) != filename or not filename.endswith(".xlsx") or not isfile(report_path):
+        raise HTTPException(status_code=404, detail=f"No report found at {location}/{year}/{filename}")
+
+    # Served straight from the generated reports. A single Range is answered with just those bytes, so downloads can be resumed.
+    file_stat = stat(report_path)
+    last_modified = formatdate(file_stat.st_mtime, usegmt=True)
+    headers = {"Accept-Ranges": "bytes", "Last-Modified": last_modified}
+
+    # A resumed download only gets part of the report if the report has not changed since the download started.
+    byte_range = None
+    if request.headers.get("if-range", last_modified) == last_modified:
+        byte_range = get_byte_range(request.headers.get("range"), file_stat.st_size)
+    if byte_range is None:
+        return FileResponse(path=report_path, filename=filename, headers=headers)
+
+    start, end = byte_range
+    headers.update({
+        "Content-Range": f"bytes {start}-{end}/{file_stat.st_size}",
+        "Content-Length": str(end - start + 1),
+        "Content-Disposition": f'attachment; filename="{filename}"',
+    })
+    return StreamingResponse(read_byte_range(report_path, start, end), status_code=206, headers=headers, media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("server:app", host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run("server:app", host="0.0.0.0", port=8000)
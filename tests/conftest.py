@@ -0,0 +1,5 @@
+"""Shared setup for the tests, which import the scripts package from the root of the project."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
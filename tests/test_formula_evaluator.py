@@ -0,0 +1,66 @@
+"""Tests for FormulaEvaluator, against the values Excel cached in the report templates."""
+import glob
+import os
+from datetime import date, datetime, time
+import openpyxl
+import pytest
+from openpyxl.utils.datetime import to_excel
+from scripts.utils.formula_evaluator import DIV_ZERO, FormulaEvaluator
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts", "Report_Templates")
+TEMPLATES = sorted(glob.glob(os.path.join(TEMPLATE_DIR, "*_Sales_Report_Template.xlsx")))
+
+def normalize(value: object) -> object:
+    # Cells with a date format are read as dates, while the evaluator returns the serial number Excel stores.
+    if isinstance(value, (datetime, date, time)):
+        value = to_excel(value)
+    # Excel stores 15 significant digits, so floats are compared to that precision.
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return value
+    return float(f"{value:.15g}") + 0.0
+
+@pytest.mark.parametrize("template", TEMPLATES, ids=os.path.basename)
+def test_template_formulas_match_excel(template):
+    formulas = openpyxl.load_workbook(template)
+    cached = openpyxl.load_workbook(template, data_only=True)
+    evaluator = FormulaEvaluator(formulas)
+
+    checked = 0
+    mismatches = {}
+    for sheet in formulas.worksheets:
+        for row in sheet.iter_rows():
+            for cell in row:
+                if not (isinstance(cell.value, str) and cell.value.startswith("=")):
+                    continue
+                expected = cached[sheet.title][cell.coordinate].value
+                actual = evaluator.evaluate(sheet.title, cell.coordinate)
+                if normalize(actual) != normalize(expected):
+                    mismatches[f"{sheet.title}!{cell.coordinate}"] = (cell.value, actual, expected)
+                checked += 1
+
+    assert checked > 0
+    assert mismatches == {}
+
+def test_seeded_values_are_evaluated_through_formulas():
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = "Mon"
+    totals = workbook.create_sheet("Week Totals")
+    sheet["A1"], sheet["A2"] = 1, 2
+    sheet["A3"] = "=SUM(A1:A2)"
+    sheet["A4"] = "=IF(A3>10,\"High\",\"Low\")"
+    sheet["A5"] = "=A1/A6"
+    totals["A1"] = "=ROUND(Mon!A3*1.005,2)"
+
+    evaluator = FormulaEvaluator(workbook)
+    assert evaluator.evaluate("Mon", "A3") == 3
+    assert evaluator.evaluate("Mon", "A4") == "Low"
+    assert evaluator.evaluate("Mon", "A5") == DIV_ZERO
+    assert evaluator.evaluate("Week Totals", "A1") == 3.02
+
+    # Seeded values replace the workbook's, and the cached results that depend on them.
+    evaluator.seed("Mon", {"A1": 20, "A6": 4})
+    assert evaluator.evaluate("Mon", "A3") == 22
+    assert evaluator.evaluate("Mon", "A4") == "High"
+    assert evaluator.evaluate("Mon", "A5") == 5
+    assert evaluator.evaluate("Week Totals", "A1") == 22.11
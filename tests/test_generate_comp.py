@@ -0,0 +1,41 @@
+"""Tests for the placement of weeks in the comp summary."""
+import shutil
+from datetime import datetime
+from pathlib import Path
+import openpyxl
+from scripts.generate_comp import CompSummaryGenerator
+from scripts.utils import RestaurantNames
+
+ROOT = Path(__file__).resolve().parent.parent
+
+def create_root(tmp_path) -> Path:
+    templates = tmp_path / "scripts" / "Report_Templates" / "Summaries"
+    templates.mkdir(parents=True)
+    shutil.copy(ROOT / "scripts" / "Report_Format.json", tmp_path / "scripts")
+    shutil.copy(ROOT / "scripts" / "Report_Templates" / "Summaries" / "QPB_Comp_Summary_Template.xlsx", templates)
+    return tmp_path
+
+def read_weeks(path) -> list:
+    sheet = openpyxl.load_workbook(path)["Comp. Summary"]
+    return [(cell.value, sheet.cell(6, cell.column).value) for cell in sheet[5][1:] if cell.value is not None]
+
+def test_the_same_week_of_different_years_gets_its_own_column(tmp_path):
+    generator = CompSummaryGenerator(str(create_root(tmp_path)))
+    entries = lambda covers: [covers] + [0] * 39
+
+    path = generator.write_summary(RestaurantNames.BISTRO, {datetime(2024, 6, 2): entries(10)})
+    generator.write_summary(RestaurantNames.BISTRO, {datetime(2030, 6, 2): entries(20)})
+    assert read_weeks(path) == [(datetime(2030, 6, 2), 20), (datetime(2024, 6, 2), 10)]
+
+    # Rewriting a week updates its column in place, and the header still reads "WE Jun-02".
+    generator.write_summary(RestaurantNames.BISTRO, {datetime(2024, 6, 2): entries(15)})
+    assert read_weeks(path) == [(datetime(2030, 6, 2), 20), (datetime(2024, 6, 2), 15)]
+    assert openpyxl.load_workbook(path)["Comp. Summary"]["C5"].number_format == CompSummaryGenerator.WEEK_HEADER_FORMAT
+
+def test_new_weeks_keep_the_title_over_the_summary(tmp_path):
+    generator = CompSummaryGenerator(str(create_root(tmp_path)))
+
+    path = generator.write_summary(RestaurantNames.BISTRO, {datetime(2024, 5, 26): [0] * 40, datetime(2024, 6, 2): [0] * 40})
+    sheet = openpyxl.load_workbook(path)["Comp. Summary"]
+    assert sheet["E2"].value == "LUNCH & DINNER SALES REPORT (Rolling N-Week)"
+    assert "E2:L2" in {str(merged) for merged in sheet.merged_cells.ranges}
@@ -0,0 +1,127 @@
+"""Tests for the payment and sales calculations of ReportGeneratorHelper, against totals worked out by hand."""
+from math import nan
+from pandas import DataFrame, NaT, Series, Timestamp, isna
+import pytest
+from scripts.utils import ReportGeneratorHelper
+
+def make_payments() -> DataFrame:
+    return DataFrame({
+        "Order ID": [1, 2, 3, 4, 5],
+        "Order Approved": ["05/28/2024 12:30:00 PM", "05/28/2024 18:05", "05/28/2024 08:15:00 AM", "05/28/2024", nan],
+        "Type": ["Visa", "Visa", "Discover", "Master", "Cash"],
+        "Curr.": ["USD", "USD", "USD", "USD", "JMD"],
+        "Amt": [10.0, 5.25, 7.0, 3.0, -1500.0],
+    })
+
+def test_group_totals_nests_the_totals_and_keeps_missing_keys():
+    df = DataFrame({"Type": ["Visa", "Cash", "Visa", None], "Curr.": ["USD", "JMD", "USD", "USD"], "Amt": [1.5, 100.0, 2.0, 4.0]})
+
+    assert ReportGeneratorHelper.group_totals(df, ["Type", "Curr."], "Amt") == {"Visa": {"USD": 3.5}, "Cash": {"JMD": 100.0}, None: {"USD": 4.0}}
+    assert ReportGeneratorHelper.group_totals(df, ["Curr."], "Amt") == {"USD": 7.5, "JMD": 100.0}
+    assert ReportGeneratorHelper.group_totals(df.iloc[:0], ["Type"], "Amt") == {}
+
+def test_payment_totals_record_discover_against_master():
+    payments = ReportGeneratorHelper.clean_payments(make_payments())
+
+    assert ReportGeneratorHelper.calculate_total_by_payment_type(payments) == {
+        "Visa": {"USD": 15.25},
+        "Master": {"USD": 10.0},
+        "Cash": {"JMD": 1500.0},
+    }
+    assert ReportGeneratorHelper.calculate_total_by_meal_and_payment_type(payments) == {
+        "Lunch": {"Visa": {"USD": 10.0}, "Master": {"USD": 3.0}},
+        "Dinner": {"Visa": {"USD": 5.25}},
+        "Breakfast": {"Master": {"USD": 7.0}},
+        None: {"Cash": {"JMD": -1500.0}},
+    }
+
+def make_sales() -> DataFrame:
+    # Order 1 is a regular order, 2 and 6 are complimentary, and 3 is not since a Beverage was also given away.
+    # Orders 4 and 5 are bar only: 4 has no guests on its first line, and 5 spans Lunch and Dinner.
+    return DataFrame({
+        "Order ID": [1, 1, 1, 2, 3, 3, 4, 4, 5, 5, 6],
+        "Session": ["Lunch", "Lunch", "Lunch", "Lunch", "Dinner", "Dinner", "Dinner", "Dinner", "Lunch", "Dinner", "Dinner"],
+        "Category": ["Food", "Beverage", "SERVICE", "Food", "Food", "Beverage", "Beverage", "Beverage", "Beverage", "Beverage", "Food"],
+        "Guests": [2, nan, nan, 1, 2, nan, nan, 3, 1, 2, 2],
+        "Sale Net": [20.0, 5.5, 2.0, 10.0, 15.0, 4.0, 8.0, 6.0, 3.0, 7.0, 9.0],
+        "Sale Disc. %": [0, 0, 0, 100, 100, 100, 0, 0, 0, 0, 100],
+        "VAT": [1.0, 0.5, 0.0, 0.0, 0.0, 0.0, 0.75, 0.25, 0.0, 0.5, 0.0],
+    })
+
+def test_summarise_orders_collapses_each_order_session_and_category():
+    summary = ReportGeneratorHelper.summarise_orders(make_sales())
+
+    assert list(summary.index) == [
+        (1, "Lunch", "Food"), (1, "Lunch", "Beverage"), (1, "Lunch", "SERVICE"), (2, "Lunch", "Food"), (3, "Dinner", "Food"),
+        (3, "Dinner", "Beverage"), (4, "Dinner", "Beverage"), (5, "Lunch", "Beverage"), (5, "Dinner", "Beverage"), (6, "Dinner", "Food"),
+    ]
+    order_4 = summary.loc[(4, "Dinner", "Beverage")]
+    assert (order_4["Sale Net"], order_4["VAT"], order_4["Sale Disc. %"]) == (14.0, 1.0, 0)
+    assert isna(order_4["Guests"])
+
+def test_complimentary_covers_only_count_fully_discounted_food_orders():
+    sales = make_sales()
+
+    assert ReportGeneratorHelper.calculate_complimentary_covers(sales) == 2
+    assert ReportGeneratorHelper.calculate_complimentary_covers(sales, by_session=True) == {"Lunch": 1, "Dinner": 1}
+
+def test_sales_metrics_take_guests_from_the_first_line_of_each_order():
+    metrics = ReportGeneratorHelper.calculate_sales_metrics(make_sales())
+
+    assert metrics["SUB_CATEGORY"] == {"Lunch": {"Food": 30.0, "Beverage": 8.5, "SERVICE": 2.0}, "Dinner": {"Food": 24.0, "Beverage": 25.0}}
+    # Order 4 has no guests on its first line, and order 5 is counted in Lunch, where it started.
+    assert metrics["GUESTS"] == {"Lunch": 4, "Dinner": 4}
+    assert metrics["COMPLIMENTARY_COVERS"] == 2
+    assert (metrics["SERVICE"], metrics["VAT"], metrics["LEVY"]) == (2.0, 3.0, 0)
+
+    assert ReportGeneratorHelper.calculate_sales_metrics(make_sales(), is_cdp=True)["GUESTS"] == {"Lunch": 3, "Dinner": 3}
+
+def test_bar_only_covers_total_each_session_of_the_orders_without_food():
+    bar_only = ReportGeneratorHelper.calculate_bar_only_covers(make_sales())
+
+    # Order 4 has no guests on its first line, so it adds its sales but no covers to Dinner.
+    # Order 5 is counted in Lunch, where it started, with the sales of both sessions.
+    assert bar_only == {
+        "Breakfast": {"Count": 0, "Sales": 0},
+        "Lunch": {"Count": 1, "Sales": 10.0},
+        "Dinner": {"Count": 0, "Sales": 14.0},
+    }
+    assert ReportGeneratorHelper.calculate_sales_metrics(make_sales())["BAR_ONLY"] == bar_only
+
+def test_parse_payment_dates_accepts_the_three_export_formats():
+    dates = ReportGeneratorHelper.parse_payment_dates(make_payments()["Order Approved"])
+
+    assert list(dates) == [
+        Timestamp(2024, 5, 28, 12, 30), Timestamp(2024, 5, 28, 18, 5), Timestamp(2024, 5, 28, 8, 15), Timestamp(2024, 5, 28), NaT,
+    ]
+
+def test_parse_payment_dates_rejects_unparseable_dates():
+    with pytest.raises(ValueError):
+        ReportGeneratorHelper.parse_payment_dates(Series(["05/28/2024 12:30:00 PM", "28/05/2024 13:00"]))
+
+def test_clean_payments_classifies_sessions_by_the_approved_hour():
+    payments = ReportGeneratorHelper.clean_payments(make_payments())
+
+    # A date without a time is approved at midnight, which falls in Lunch.
+    assert list(payments["Session"]) == ["Lunch", "Dinner", "Breakfast", "Lunch", None]
+
+def test_clean_categorical_cleans_each_distinct_value_once():
+    calls = []
+    def clean_session(session: str) -> str:
+        calls.append(session)
+        return session.split("-")[1]
+
+    cleaned = ReportGeneratorHelper.clean_categorical(Series(["3-Dinner", "2-Lunch", "3-Dinner", "2-Lunch"]), clean_session)
+
+    assert list(cleaned) == ["Dinner", "Lunch", "Dinner", "Lunch"]
+    assert cleaned.dtype == "category"
+    assert sorted(calls) == ["2-Lunch", "3-Dinner"]
+
+def test_clean_sales_strips_the_session_and_category_prefixes():
+    sales = ReportGeneratorHelper.clean_sales(DataFrame({
+        "Session": ["2-Lunch", "3-Dinner", "2-Lunch"],
+        "Category": ["QPB/Sales/Food", "QPB/Sales/Beverage", "QPB/Service"],
+    }))
+
+    assert list(sales["Session"]) == ["Lunch", "Dinner", "Lunch"]
+    assert list(sales["Category"]) == ["Food", "Beverage", "SERVICE"]
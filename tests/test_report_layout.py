@@ -0,0 +1,32 @@
+"""Tests for resolving the report values against the compiled Report_Format.json."""
+from pathlib import Path
+from scripts.utils import ReportLayout
+
+FORMAT_PATH = Path(__file__).resolve().parent.parent / "scripts" / "Report_Format.json"
+
+def make_data() -> dict:
+    return {
+        "SUB_CATEGORY": {"Lunch": {"Food": 30.0, "SERVICE": 2.0}, "Brunch": {"Food": 12.0}},
+        "PAYMENT_TYPE": {"VISA": {"BBD": 20.0}, "Cash": {"BBD": 5.0, "USD": 10.0, "EUR": 8.0}},
+        "GUESTS": {"Lunch": 4, "Brunch": 2},
+        "COMPLIMENTARY_COVERS": 1,
+        "BAR_ONLY": {"Lunch": {"Count": 1, "Sales": 10.0}},
+        "LEVY": 0,
+        "VAT": 3.0,
+        "SERVICE": 2.0,
+    }
+
+def test_resolve_logs_the_values_that_have_no_cell(capsys):
+    layout = ReportLayout.get_layout(str(FORMAT_PATH))
+
+    cells = dict(layout.resolve(layout.get_values(make_data(), "05/28/2024")))
+
+    assert (cells["B11"], cells["B33"], cells["F45"], cells["K29"]) == (30.0, 10.0, 4, 2.0)
+    assert 8.0 not in cells.values() and 12.0 not in cells.values()
+
+    warnings = [line for line in capsys.readouterr().out.splitlines() if line.startswith("No cell for")]
+    assert warnings == [
+        "No cell for Matrix Brunch Food in the Report_Format.json. Its value of 12.0 is not written to the report.",
+        "No cell for Foreign_Currency EUR in the Report_Format.json. Its value of 8.0 is not written to the report.",
+        "No cell for Guests Brunch in the Report_Format.json. Its value of 2 is not written to the report.",
+    ]
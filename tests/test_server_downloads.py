@@ -0,0 +1,55 @@
+"""Tests for resuming report downloads from /reports with Range requests."""
+import os
+import pytest
+from fastapi.testclient import TestClient
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    # The server mounts ./static when it is imported, so it is imported from the root of the project.
+    monkeypatch.chdir(ROOT)
+    import server
+
+    report_dir = tmp_path / "documents" / "Generated_Reports" / "QP_Bistro" / "2024"
+    report_dir.mkdir(parents=True)
+    (report_dir / "QPB_27_May_to_02_Jun_Report.xlsx").write_bytes(bytes(range(256)) * 4)
+
+    monkeypatch.chdir(tmp_path)
+    return TestClient(server.app)
+
+URL = "/reports/BISTRO/2024/QPB_27_May_to_02_Jun_Report.xlsx"
+CONTENT = bytes(range(256)) * 4
+
+def test_whole_report_is_sent_without_a_range(client):
+    response = client.get(URL)
+
+    assert response.status_code == 200
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.content == CONTENT
+
+@pytest.mark.parametrize("range_header, start, end", [
+    ("bytes=100-199", 100, 199),
+    ("bytes=1000-", 1000, 1023),
+    ("bytes=-24", 1000, 1023),
+    ("bytes=1000-5000", 1000, 1023),
+])
+def test_range_request_gets_only_its_bytes(client, range_header, start, end):
+    response = client.get(URL, headers={"Range": range_header})
+
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes {start}-{end}/{len(CONTENT)}"
+    assert response.headers["content-length"] == str(end - start + 1)
+    assert response.content == CONTENT[start:end + 1]
+
+def test_range_after_the_end_is_not_satisfiable(client):
+    response = client.get(URL, headers={"Range": "bytes=2000-"})
+
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(CONTENT)}"
+
+def test_range_of_a_changed_report_sends_the_whole_report(client):
+    response = client.get(URL, headers={"Range": "bytes=100-199", "If-Range": "Mon, 01 Jan 2024 00:00:00 GMT"})
+
+    assert response.status_code == 200
+    assert response.content == CONTENT
@@ -0,0 +1,68 @@
+"""Tests for how UploadCatalog finds, validates and prunes the uploads of a restaurant."""
+import os
+from datetime import datetime
+from scripts.utils import UploadCatalog
+
+def create_uploads(tmp_path, *names: str) -> str:
+    upload_dir = tmp_path / "documents" / "Upload" / "QP_Bistro"
+    upload_dir.mkdir(parents=True, exist_ok=True)
+    for name in names:
+        (upload_dir / name).write_text("data")
+    return str(upload_dir)
+
+def touch_folder(folder: str) -> None:
+    # Some file systems only keep coarse modification times, so the folder is marked as changed explicitly.
+    stat = os.stat(folder)
+    os.utime(folder, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+def test_scan_skips_files_not_named_like_an_upload(tmp_path):
+    create_uploads(
+        tmp_path,
+        "QPB-Sales-20240527.csv",
+        "QPB-Payments-20240527.csv",
+        "QPB-Sales-20240528.csv",
+        "QPB-Sales-2024.csv",
+        "QPB-Sales-20241340.csv",
+        "QPB-Payments-2024528.csv",
+        "QPB-Refunds-20240529.csv",
+        "QPB-Sales-20240529.txt",
+        "QPB-Sales-20240529-copy.csv",
+        "TPS-Sales-20240530.csv",
+        "TPS-Payments-20240530.csv",
+        "notes.csv",
+    )
+    catalog = UploadCatalog(str(tmp_path))
+
+    assert sorted(catalog.scan_restaurant("QP Bistro")["uploads"]) == ["20240527", "20240528"]
+    assert catalog.get_upload_dates("QP Bistro") == [datetime(2024, 5, 27)]
+
+def test_files_added_or_deleted_by_hand_are_found_without_a_rescan(tmp_path):
+    upload_dir = create_uploads(tmp_path, "QPB-Sales-20240527.csv", "QPB-Payments-20240527.csv")
+    catalog = UploadCatalog(str(tmp_path))
+    assert catalog.get_upload_dates("QP Bistro") == [datetime(2024, 5, 27)]
+
+    create_uploads(tmp_path, "QPB-Sales-20240528.csv", "QPB-Payments-20240528.csv")
+    os.remove(f"{upload_dir}/QPB-Payments-20240527.csv")
+    touch_folder(upload_dir)
+
+    assert catalog.get_upload_dates("QP Bistro") == [datetime(2024, 5, 28)]
+    assert catalog.read("QP Bistro")["uploads"]["20240527"].keys() == {"Sales"}
+
+def test_unchanged_catalog_is_not_scanned_again(tmp_path, monkeypatch):
+    create_uploads(tmp_path, "QPB-Sales-20240527.csv", "QPB-Payments-20240527.csv")
+    catalog = UploadCatalog(str(tmp_path))
+    catalog.load_restaurant("QP Bistro")
+
+    def fail_scan(restaurant_name: str) -> dict:
+        raise AssertionError("The catalog was scanned again")
+
+    monkeypatch.setattr(catalog, "scan_restaurant", fail_scan)
+    assert catalog.get_upload_dates("QP Bistro") == [datetime(2024, 5, 27)]
+
+def test_reports_are_keyed_by_the_first_day_of_their_week(tmp_path):
+    report_dir = tmp_path / "documents" / "Generated_Reports" / "QP_Bistro" / "2025"
+    report_dir.mkdir(parents=True)
+    for name in ("QPB_27_May_to_02_Jun_Report.xlsx", "QPB_30_Dec_to_05_Jan_Report.xlsx", "QPB_Notes_Report.xlsx", "TPS_27_May_to_02_Jun_Report.xlsx"):
+        (report_dir / name).write_bytes(b"report")
+
+    assert UploadCatalog(str(tmp_path)).get_report_weeks("QP Bistro") == [datetime(2024, 12, 30), datetime(2025, 5, 27)]
@@ -0,0 +1,70 @@
+"""Tests for how UploadManifest decides whether a generated day is still current."""
+import os
+from scripts.generate_reports import ReportGenerator
+from scripts.utils import ReportGeneratorHelper, RestaurantNames, UploadManifest
+
+def create_day(tmp_path) -> tuple[dict[str, str], str]:
+    inputs = {}
+    for name in ("Sales", "Payments"):
+        path = tmp_path / f"{name}.csv"
+        path.write_text(f"{name},1\n")
+        inputs[name] = str(path)
+
+    output = tmp_path / "report.xlsx"
+    output.write_bytes(b"report")
+    return inputs, str(output)
+
+def test_day_is_current_while_its_inputs_are_unchanged(tmp_path):
+    manifest = UploadManifest(str(tmp_path))
+    inputs, output = create_day(tmp_path)
+    entry = manifest.create_entry(manifest.fingerprint_inputs(inputs), output)
+
+    assert manifest.is_current(entry, inputs, output)
+
+    # Touching a file without changing it is caught by its hash.
+    os.utime(inputs["Sales"], ns=(0, 0))
+    assert manifest.is_current(entry, inputs, output)
+
+def test_day_is_stale_once_an_input_changes(tmp_path):
+    manifest = UploadManifest(str(tmp_path))
+    inputs, output = create_day(tmp_path)
+    entry = manifest.create_entry(manifest.fingerprint_inputs(inputs), output)
+
+    # The new contents have the same size, so only the modification time and hash differ.
+    with open(inputs["Payments"], "w") as f:
+        f.write("Payments,2\n")
+
+    assert not manifest.is_current(entry, inputs, output)
+
+def test_change_made_after_the_snapshot_is_not_recorded(tmp_path):
+    manifest = UploadManifest(str(tmp_path))
+    inputs, output = create_day(tmp_path)
+
+    # The inputs change after they were fingerprinted and read, but before the day is recorded.
+    fingerprints = manifest.fingerprint_inputs(inputs)
+    with open(inputs["Sales"], "w") as f:
+        f.write("Sales,2\n")
+    manifest.record("QP Bistro", {"20240527": manifest.create_entry(fingerprints, output)})
+
+    assert not manifest.is_current(manifest.load("QP Bistro")["20240527"], inputs, output)
+
+def test_day_is_stale_when_an_input_or_the_output_is_missing(tmp_path):
+    manifest = UploadManifest(str(tmp_path))
+    inputs, output = create_day(tmp_path)
+    entry = manifest.create_entry(manifest.fingerprint_inputs(inputs), output)
+
+    assert not manifest.is_current(entry, {**inputs, "Template": str(tmp_path / "missing.xlsx")}, output)
+    assert not manifest.is_current(manifest.create_entry(manifest.fingerprint_inputs(inputs), str(tmp_path / "missing.xlsx")), inputs, str(tmp_path / "missing.xlsx"))
+
+def test_day_is_stale_once_the_cleaner_or_metrics_version_changes(tmp_path, monkeypatch):
+    inputs, output = create_day(tmp_path)
+    manifest = ReportGenerator(RestaurantNames.BISTRO, None, str(tmp_path)).manifest
+    entry = manifest.create_entry(manifest.fingerprint_inputs(inputs), output)
+    assert manifest.is_current(entry, inputs, output)
+
+    monkeypatch.setattr(ReportGeneratorHelper, "METRICS_VERSION", ReportGeneratorHelper.METRICS_VERSION + 1)
+    assert not ReportGenerator(RestaurantNames.BISTRO, None, str(tmp_path)).manifest.is_current(entry, inputs, output)
+
+    monkeypatch.undo()
+    monkeypatch.setattr(ReportGeneratorHelper, "CLEANER_VERSION", ReportGeneratorHelper.CLEANER_VERSION + 1)
+    assert not ReportGenerator(RestaurantNames.BISTRO, None, str(tmp_path)).manifest.is_current(entry, inputs, output)
@@ -0,0 +1,101 @@
+"""Tests for the batching and failure isolation of WorkbookWriter."""
+import threading
+import openpyxl
+import pytest
+from scripts.utils import ExcelController, WorkbookWriter
+from scripts.utils.workbook_writer import PendingUpdate
+
+def create_workbook(path) -> None:
+    workbook = openpyxl.Workbook()
+    workbook.active["A1"] = "original"
+    workbook.save(path)
+
+def read_cells(path) -> dict:
+    sheet = openpyxl.load_workbook(path).active
+    return {cell.coordinate: cell.value for row in sheet.iter_rows() for cell in row if cell.value is not None}
+
+def write(values: dict):
+    return lambda controller: controller.write_cells(values)
+
+def test_update_saves_changes_and_skips_unchanged_workbooks(tmp_path):
+    path = str(tmp_path / "report.xlsx")
+    create_workbook(path)
+    open_workbook = lambda: ExcelController(path)
+
+    assert WorkbookWriter.update(path, open_workbook, write({"B1": 1, "B2": 2})) == 2
+    assert read_cells(path) == {"A1": "original", "B1": 1, "B2": 2}
+
+    # Writing the same values again leaves the file untouched.
+    mtime = (tmp_path / "report.xlsx").stat().st_mtime_ns
+    assert WorkbookWriter.update(path, open_workbook, write({"B1": 1, "B2": 2})) == 0
+    assert (tmp_path / "report.xlsx").stat().st_mtime_ns == mtime
+
+def test_update_creates_the_workbook_and_its_folder(tmp_path):
+    path = str(tmp_path / "Summaries" / "summary.xlsx")
+
+    assert WorkbookWriter.update(path, lambda: ExcelController(path, workbook=openpyxl.Workbook()), write({"A1": "new"})) == 1
+    assert read_cells(path) == {"A1": "new"}
+
+def test_queued_updates_are_applied_in_one_save(tmp_path):
+    path = str(tmp_path / "report.xlsx")
+    create_workbook(path)
+    opened = []
+
+    def open_workbook() -> ExcelController:
+        opened.append(threading.current_thread().name)
+        return ExcelController(path)
+
+    # The first update holds the workbook until the others have been queued behind it.
+    started, release = threading.Event(), threading.Event()
+
+    def blocking_update(controller: ExcelController) -> int:
+        started.set()
+        release.wait(10)
+        return controller.write_cells({"B1": "first"})
+
+    first = threading.Thread(target=WorkbookWriter.update, args=(path, open_workbook, blocking_update), name="first")
+    first.start()
+    started.wait(10)
+
+    others = [threading.Thread(target=WorkbookWriter.update, args=(path, open_workbook, write({f"C{i}": i})), name=f"other{i}") for i in range(1, 4)]
+    for thread in others:
+        thread.start()
+    while len(WorkbookWriter.queues.get(str(tmp_path / "report.xlsx"), [])) < len(others):
+        threading.Event().wait(0.01)
+
+    release.set()
+    for thread in [first] + others:
+        thread.join(10)
+
+    # The first update opens the workbook once, and whichever queued caller gets it next applies all of the queued updates.
+    assert len(opened) == 2
+    assert read_cells(path) == {"A1": "original", "B1": "first", "C1": 1, "C2": 2, "C3": 3}
+    assert str(tmp_path / "report.xlsx") not in WorkbookWriter.locks
+
+def test_failed_update_is_not_saved_with_the_rest_of_its_batch(tmp_path):
+    path = str(tmp_path / "report.xlsx")
+    create_workbook(path)
+
+    def failing_update(controller: ExcelController) -> int:
+        controller.write_cells({"D1": "partial"})
+        raise ValueError("failed halfway")
+
+    batch = [PendingUpdate(update) for update in (write({"B1": 1}), failing_update, write({"B2": 2}))]
+    WorkbookWriter.apply(path, lambda: ExcelController(path), batch)
+
+    assert [pending.result for pending in batch] == [1, 0, 1]
+    assert isinstance(batch[1].error, ValueError)
+    assert batch[0].error is None and batch[2].error is None
+    assert read_cells(path) == {"A1": "original", "B1": 1, "B2": 2}
+
+def test_update_raises_its_own_error(tmp_path):
+    path = str(tmp_path / "report.xlsx")
+    create_workbook(path)
+
+    def failing_update(controller: ExcelController) -> int:
+        raise ValueError("failed")
+
+    with pytest.raises(ValueError):
+        WorkbookWriter.update(path, lambda: ExcelController(path), failing_update)
+    assert read_cells(path) == {"A1": "original"}
+    assert path not in WorkbookWriter.locks